@@ -0,0 +1,235 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne
+import db_connection
+from customer_profiles import PROFILE_COLLECTION, CustomerProfileStore
+from sales_schema import REQUIRED_FIELDS, to_records
+from stratified_sampling import SAMPLE_KEY
+from timeseries_storage import get_sales_collection
+from transformations import DataTransformer
+from cli_options import parse_args
+
+# Fields read back from each document; everything the transformer derives from them is rewritten
+SOURCE_FIELDS = ['_id', SAMPLE_KEY] + list(REQUIRED_FIELDS)
+
+# Per-process state for pool workers, set up once by _init_worker
+_worker = {}
+
+
+class BackfillCheckpoint:
+    """Partition boundaries and finished partitions of a backfill, persisted so a rerun resumes"""
+
+    def __init__(self, path, by):
+        self.path = path
+        self.by = by
+        self.partitions = []
+        self.done = {}
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get('by') != by:
+                raise ValueError(
+                    f"Checkpoint {path} partitions by {state.get('by')}, not {by}; delete it to start a new backfill"
+                )
+            self.partitions = state['partitions']
+            self.done = {int(index): count for index, count in state.get('done', {}).items()}
+
+    def save(self):
+        if not self.path:
+            return
+        # Write-then-rename so a crash never leaves a truncated checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'by': self.by, 'partitions': self.partitions, 'done': self.done}, f)
+        os.replace(tmp_path, self.path)
+
+    def commit(self, index, count):
+        self.done[index] = count
+        self.save()
+
+
+def partition_by_id(collection, partitions, oversample=20):
+    """Split the _id space at quantiles of a $sample, so partitions hold similar document counts"""
+    sample = sorted(doc['_id'] for doc in collection.aggregate([
+        {'$sample': {'size': partitions * oversample}},
+        {'$project': {'_id': 1}}
+    ]))
+    if not sample:
+        return []
+    bounds = [str(sample[len(sample) * i // partitions]) for i in range(1, partitions)]
+    bounds = sorted(set(bounds))
+    return [{'start': start, 'end': end} for start, end in zip([None] + bounds, bounds + [None])]
+
+
+def partition_by_timestamp(collection):
+    """One partition per calendar day between the oldest and newest timestamp"""
+    first = collection.find_one({}, {'timestamp': 1}, sort=[('timestamp', 1)])
+    last = collection.find_one({}, {'timestamp': 1}, sort=[('timestamp', -1)])
+    if not first or not last:
+        return []
+    day = datetime.combine(first['timestamp'].date(), datetime.min.time())
+    ranges = []
+    while day <= last['timestamp']:
+        ranges.append({'start': day.isoformat(), 'end': (day + timedelta(days=1)).isoformat()})
+        day += timedelta(days=1)
+    return ranges
+
+
+def partition_filter(partition, by):
+    """Query selecting the documents of one partition"""
+    field, parse = ('_id', ObjectId) if by == 'id' else ('timestamp', datetime.fromisoformat)
+    bounds = {}
+    if partition['start'] is not None:
+        bounds['$gte'] = parse(partition['start'])
+    if partition['end'] is not None:
+        bounds['$lt'] = parse(partition['end'])
+    return {field: bounds} if bounds else {}
+
+
+def _init_worker(timeseries, profiles, cents):
+    db = db_connection.get_database()
+    profile_store = CustomerProfileStore(db[PROFILE_COLLECTION]) if profiles else None
+    _worker['collection'] = get_sales_collection(db, timeseries)
+    _worker['transformer'] = DataTransformer(verbose=False, profile_store=profile_store, cents=cents)
+
+
+def rederive(transformer, documents):
+    """Re-run enrichment and business rules over stored documents; returns $set updates by _id
+
+    clean_data is skipped on purpose: stored documents were already accepted, and the
+    backfill must update them rather than drop any.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(documents)
+    existing_keys = df[SAMPLE_KEY] if SAMPLE_KEY in df else None
+    df = transformer.apply_business_rules(transformer.enrich_data(df))
+
+    # Keep sample keys already stored, so approximate dashboard samples stay stable
+    if existing_keys is not None:
+        df[SAMPLE_KEY] = existing_keys.fillna(df[SAMPLE_KEY]).to_numpy()
+
+    derived = [column for column in df.columns if column != '_id' and column not in REQUIRED_FIELDS]
+    return [
+        UpdateOne({'_id': record.pop('_id')}, {'$set': record})
+        for record in to_records(df[['_id'] + derived])
+    ]
+
+
+def backfill_partition(index, partition, by, batch_size):
+    """Pool task: rewrite one partition in batches; returns (index, documents rewritten)"""
+    collection = _worker['collection']
+    transformer = _worker['transformer']
+    cursor = collection.find(partition_filter(partition, by), SOURCE_FIELDS, batch_size=batch_size)
+
+    rewritten = 0
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) == batch_size:
+            rewritten += collection.bulk_write(rederive(transformer, batch), ordered=False).matched_count
+            batch = []
+    if batch:
+        rewritten += collection.bulk_write(rederive(transformer, batch), ordered=False).matched_count
+    return index, rewritten
+
+
+class Backfill:
+    """Re-derive the transformer's fields for every stored document across a process pool
+
+    sales_data is split into _id ranges (sampled quantiles) or calendar days; each
+    partition is read, re-enriched and written back with unordered bulk $set updates
+    in a worker process. Finished partitions are checkpointed, so an interrupted run
+    picks up with the partitions that had not completed.
+    """
+
+    def __init__(self, workers=4, partitions=None, by='id', batch_size=5000,
+                 checkpoint_file='backfill_checkpoint.json', timeseries=False, profiles=False, cents=False):
+        if by not in ('id', 'timestamp'):
+            raise ValueError(f"by must be 'id' or 'timestamp', got '{by}'")
+        self.workers = workers
+        self.partitions = partitions or workers * 8
+        self.by = by
+        self.batch_size = batch_size
+        self.checkpoint = BackfillCheckpoint(checkpoint_file, by)
+        self.timeseries = timeseries
+        self.profiles = profiles
+        self.cents = cents
+
+    def plan(self, collection):
+        """Partition boundaries, reused from the checkpoint when resuming"""
+        if not self.checkpoint.partitions:
+            if self.by == 'id':
+                self.checkpoint.partitions = partition_by_id(collection, self.partitions)
+            else:
+                self.checkpoint.partitions = partition_by_timestamp(collection)
+            self.checkpoint.save()
+        return self.checkpoint.partitions
+
+    def run(self):
+        db_connection.acquire()
+        try:
+            db_connection.verify_connection()
+            collection = get_sales_collection(db_connection.get_database(), self.timeseries)
+            partitions = self.plan(collection)
+        finally:
+            # Release before forking workers; each process opens its own client
+            db_connection.release()
+
+        pending = [(i, p) for i, p in enumerate(partitions) if i not in self.checkpoint.done]
+        print(f"Backfilling {len(partitions)} partitions by {self.by} with {self.workers} workers "
+              f"({len(partitions) - len(pending)} already done)")
+
+        start_time = time.time()
+        rewritten = 0
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.timeseries, self.profiles, self.cents)) as pool:
+            futures = [pool.submit(backfill_partition, i, p, self.by, self.batch_size) for i, p in pending]
+            for future in as_completed(futures):
+                index, count = future.result()
+                self.checkpoint.commit(index, count)
+                rewritten += count
+
+                elapsed = time.time() - start_time
+                print(f"⏳ Partitions: {len(self.checkpoint.done)}/{len(partitions)} | "
+                      f"Rewritten: {rewritten:,} | {rewritten / elapsed if elapsed > 0 else 0:,.0f} docs/sec")
+
+        elapsed = time.time() - start_time
+        print(f"Backfill Summary:")
+        print(f"   Documents rewritten: {rewritten:,}")
+        print(f"   Elapsed: {elapsed:.1f}s")
+        print(f"   Sustained rate: {rewritten / elapsed if elapsed > 0 else 0:,.0f} docs/sec")
+        return rewritten
+
+
+def main():
+    """python backfill.py [workers] [partitions] [--by=id|timestamp] [--batch-size=5000]
+    [--checkpoint=backfill_checkpoint.json] [--timeseries] [--profiles] [--cents]"""
+    args, options = parse_args()
+
+    backfill = Backfill(
+        workers=int(args[0]) if args else os.cpu_count() or 4,
+        partitions=int(args[1]) if len(args) > 1 else None,
+        by=options.get('by', 'id'),
+        batch_size=int(options.get('batch-size', 5000)),
+        checkpoint_file=options.get('checkpoint', 'backfill_checkpoint.json'),
+        timeseries='timeseries' in options,
+        profiles='profiles' in options,
+        cents='cents' in options
+    )
+    try:
+        backfill.run()
+    except KeyboardInterrupt:
+        print("\n Backfill interrupted; rerun the same command to resume")
+    except Exception as e:
+        print(f" Backfill failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
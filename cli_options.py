@@ -0,0 +1,13 @@
+import sys
+
+
+def parse_args(argv=None):
+    """Split command-line arguments into (positional args, {option: value})
+
+    --name=value maps name to value and a bare --flag maps flag to '', so flags are
+    tested with 'flag' in options. Every CLI in the repo parses its arguments this way.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    args = [arg for arg in argv if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) if '=' in arg else (arg[2:], '') for arg in argv if arg.startswith('--'))
+    return args, options
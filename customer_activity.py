@@ -0,0 +1,244 @@
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+import numpy as np
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+from cli_options import parse_args
+
+ACTIVITY_COLLECTION = 'customer_activity'
+
+# Bit i of a day's bitmap is set when customer CUST_<i> (zero-padded to six digits) was active
+ID_PREFIX = 'CUST_'
+ID_SPACE = 1000000
+
+
+def day_start(value):
+    return datetime(value.year, value.month, value.day)
+
+
+def to_bitmap(positions):
+    """Python int with the given bit positions set, built in one numpy pass"""
+    if len(positions) == 0:
+        return 0
+    bits = np.zeros(int(np.max(positions)) + 1, dtype=bool)
+    bits[positions] = True
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+
+def union(bitmaps):
+    result = 0
+    for bitmap in bitmaps:
+        result |= bitmap
+    return result
+
+
+def period_bitmaps(daily, start, periods, length):
+    """Union of the daily bitmaps in each of periods consecutive windows of length from start"""
+    return [
+        union(bitmap for day, bitmap in daily.items() if start + i * length <= day < start + (i + 1) * length)
+        for i in range(periods)
+    ]
+
+
+def compress(bitmap):
+    return Binary(zlib.compress(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')))
+
+
+def decompress(data):
+    return int.from_bytes(zlib.decompress(data), 'little')
+
+
+class ActivityRecorder:
+    """Write-path listener folding each batch into per-day customer activity bitmaps
+
+    Customer numbers are buffered per day and merged into the stored bitmaps every
+    flush_interval seconds. A merge reads the day's document, ORs in the new bits and
+    writes it back only if its version is unchanged, retrying on conflict, so several
+    writers (bulk-load threads, generators) can update the same day safely.
+    """
+
+    def __init__(self, collection, flush_interval=10, retries=10):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.pending = {}
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+
+    def record_batch(self, records):
+        with self.lock:
+            for record in records:
+                customer_id = record['customer_id']
+                if not customer_id.startswith(ID_PREFIX) or not customer_id[len(ID_PREFIX):].isdigit():
+                    continue
+                number = int(customer_id[len(ID_PREFIX):])
+                if number < ID_SPACE:
+                    self.pending.setdefault(day_start(record['timestamp']), []).append(number)
+            due = time.monotonic() - self.last_flush >= self.flush_interval
+
+        if due:
+            self.flush()
+        return len(records)
+
+    def flush(self):
+        """Merge every buffered day into its stored bitmap; returns the number of days written"""
+        with self.flush_lock:
+            with self.lock:
+                pending, self.pending = self.pending, {}
+                self.last_flush = time.monotonic()
+            days = list(pending)
+            try:
+                while days:
+                    self.merge_day(days[0], to_bitmap(np.unique(pending[days[0]])))
+                    days.pop(0)
+            finally:
+                # Keep whatever was not merged for the next flush
+                with self.lock:
+                    for day in days:
+                        self.pending.setdefault(day, []).extend(pending[day])
+            return len(pending)
+
+    def merge_day(self, day, bits):
+        for _ in range(self.retries):
+            document = self.collection.find_one({'_id': day}, {'bitmap': 1, 'version': 1})
+            if document is None:
+                try:
+                    self.collection.insert_one({
+                        '_id': day, 'bitmap': compress(bits), 'active': bits.bit_count(), 'version': 1
+                    })
+                    return
+                except DuplicateKeyError:
+                    continue
+
+            stored = decompress(document['bitmap'])
+            merged = stored | bits
+            if merged == stored:
+                return
+            result = self.collection.replace_one(
+                {'_id': day, 'version': document['version']},
+                {'bitmap': compress(merged), 'active': merged.bit_count(), 'version': document['version'] + 1}
+            )
+            if result.matched_count:
+                return
+        raise RuntimeError(f"Activity bitmap for {day:%Y-%m-%d} kept changing; gave up after {self.retries} attempts")
+
+
+class CustomerActivity:
+    """Retention, active-user and repeat-rate queries over stored daily activity bitmaps
+
+    Every query loads the days it needs with one range read and answers with integer
+    OR / AND / popcount operations, without touching the sales documents.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def bitmaps(self, start, end):
+        """{day: bitmap} for days in [start, end); days with no activity are absent"""
+        cursor = self.collection.find({'_id': {'$gte': day_start(start), '$lt': day_start(end)}}, {'bitmap': 1})
+        return {document['_id']: decompress(document['bitmap']) for document in cursor}
+
+    def active(self, start, end):
+        """Bitmap of customers active on any day in [start, end)"""
+        return union(self.bitmaps(start, end).values())
+
+    def active_users(self, day):
+        """DAU, WAU and MAU for the day, weeks and 30 days ending on day"""
+        end = day_start(day) + timedelta(days=1)
+        daily = self.bitmaps(end - timedelta(days=30), end)
+        window = lambda days: union(bitmap for d, bitmap in daily.items() if d >= end - timedelta(days=days))
+        return {'dau': window(1).bit_count(), 'wau': window(7).bit_count(), 'mau': window(30).bit_count()}
+
+    def retention(self, start, periods=4, period_days=7):
+        """Share of customers active in the first period who were also active in each period
+
+        retention(week1_start)[3] answers "of the customers active in week 1, how many
+        came back in week 4".
+        """
+        start, period = day_start(start), timedelta(days=period_days)
+        active = period_bitmaps(self.bitmaps(start, start + periods * period), start, periods, period)
+        cohort = active[0]
+        size = cohort.bit_count()
+        return [{
+            'period': i,
+            'start': start + i * period,
+            'active': (cohort & bitmap).bit_count(),
+            'rate': (cohort & bitmap).bit_count() / size if size else 0.0
+        } for i, bitmap in enumerate(active)]
+
+    def cohort_table(self, start, periods=8, period_days=7):
+        """Retention matrix: cohort i is customers first seen in period i (counting from start)"""
+        start, period = day_start(start), timedelta(days=period_days)
+        active = period_bitmaps(self.bitmaps(start, start + periods * period), start, periods, period)
+
+        rows = []
+        seen = 0
+        for i, bitmap in enumerate(active):
+            cohort = bitmap & ~seen
+            seen |= bitmap
+            size = cohort.bit_count()
+            rows.append({
+                'cohort_start': start + i * period,
+                'size': size,
+                'retention': [(cohort & later).bit_count() / size if size else 0.0 for later in active[i:]]
+            })
+        return rows
+
+    def repeat_rate(self, start, end):
+        """Share of customers active in [start, end) who were active on at least two days"""
+        once = twice = 0
+        for _, bitmap in sorted(self.bitmaps(start, end).items()):
+            twice |= once & bitmap
+            once |= bitmap
+        total = once.bit_count()
+        return {'customers': total, 'repeat_customers': twice.bit_count(),
+                'repeat_rate': twice.bit_count() / total if total else 0.0}
+
+
+def main():
+    """python customer_activity.py [active|retention|cohorts|repeat] [start_date] [periods]"""
+    import db_connection
+
+    args, _ = parse_args()
+    query = args[0] if args else 'active'
+    today = day_start(db_connection.utc_now())
+    start = datetime.fromisoformat(args[1]) if len(args) > 1 else today - timedelta(days=28)
+    periods = int(args[2]) if len(args) > 2 else 4
+
+    db_connection.acquire()
+    try:
+        activity = CustomerActivity(db_connection.get_database()[ACTIVITY_COLLECTION])
+        query_start = time.perf_counter()
+        if query == 'active':
+            day = datetime.fromisoformat(args[1]) if len(args) > 1 else today
+            result = activity.active_users(day)
+            print(f" {day:%Y-%m-%d}: DAU {result['dau']:,} | WAU {result['wau']:,} | MAU {result['mau']:,}")
+        elif query == 'retention':
+            for row in activity.retention(start, periods):
+                print(f" Week {row['period'] + 1} ({row['start']:%Y-%m-%d}): {row['active']:,} returning ({row['rate']:.1%})")
+        elif query == 'cohorts':
+            for row in activity.cohort_table(start, periods):
+                rates = ' '.join(f"{rate:6.1%}" for rate in row['retention'])
+                print(f" {row['cohort_start']:%Y-%m-%d} {row['size']:>8,} | {rates}")
+        elif query == 'repeat':
+            result = activity.repeat_rate(start, today + timedelta(days=1))
+            print(f" {result['repeat_customers']:,} of {result['customers']:,} customers bought on 2+ days "
+                  f"({result['repeat_rate']:.1%})")
+        else:
+            print(f"Unknown query '{query}'; choose one of active, retention, cohorts, repeat")
+            sys.exit(1)
+        print(f" Query time: {(time.perf_counter() - query_start) * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        print("\n Query interrupted by user")
+    except Exception as e:
+        print(f" Query failed: {e}")
+        sys.exit(1)
+    finally:
+        db_connection.release()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+
+PROFILE_COLLECTION = 'customer_profiles'
+
+EMPTY_PROFILE = {'transaction_count': 0, 'total_spent': 0.0, 'last_seen': None}
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire ttl seconds after being stored"""
+
+    def __init__(self, max_size=100000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def update(self, key, func):
+        """Apply func to a cached value in place, keeping its expiry; no-op when absent"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries[key] = (entry[0], func(entry[1]))
+
+
+class CustomerProfileStore:
+    """Lifetime customer profiles in MongoDB, read through an in-process LRU/TTL cache
+
+    Profiles hold transaction_count, total_spent and last_seen, and are updated with
+    bulk upserts after every write. Segment thresholds are quantiles over a sample of
+    all profiles, refreshed periodically, so a customer's segment reflects their whole
+    history rather than whichever rows share their batch.
+    """
+
+    def __init__(self, collection, cache_size=100000, cache_ttl=300, threshold_refresh=300,
+                 threshold_refresh_records=100000, sample_size=10000):
+        self.collection = collection
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.threshold_refresh = threshold_refresh
+        self.threshold_refresh_records = threshold_refresh_records
+        self.sample_size = sample_size
+        self.thresholds = None
+        self.thresholds_loaded_at = 0
+        self.records_since_refresh = 0
+        self.lock = threading.Lock()
+
+    def get_thresholds(self):
+        """Segment thresholds from a profile sample, refreshed by age or by records written since"""
+        with self.lock:
+            if self.thresholds is not None and \
+                    time.monotonic() - self.thresholds_loaded_at < self.threshold_refresh and \
+                    self.records_since_refresh < self.threshold_refresh_records:
+                return self.thresholds
+
+            sample = list(self.collection.aggregate([
+                {'$sample': {'size': self.sample_size}},
+                {'$project': {'_id': 0, 'transaction_count': 1, 'total_spent': 1}}
+            ]))
+            if sample:
+                counts = np.array([p['transaction_count'] for p in sample], dtype=float)
+                spent = np.array([p['total_spent'] for p in sample], dtype=float)
+                self.thresholds = {
+                    'spent_80': np.quantile(spent, 0.8),
+                    'spent_90': np.quantile(spent, 0.9),
+                    'count_80': np.quantile(counts, 0.8),
+                    'count_90': np.quantile(counts, 0.9)
+                }
+            else:
+                self.thresholds = None
+            self.thresholds_loaded_at = time.monotonic()
+            self.records_since_refresh = 0
+            return self.thresholds
+
+    def get_profiles(self, customer_ids):
+        """Profiles for the given ids; cache misses are fetched with a single $in query"""
+        profiles = {}
+        misses = []
+        for customer_id in set(customer_ids):
+            profile = self.cache.get(customer_id)
+            if profile is None:
+                misses.append(customer_id)
+            else:
+                profiles[customer_id] = profile
+
+        if misses:
+            found = {
+                doc['_id']: {k: doc.get(k, EMPTY_PROFILE[k]) for k in EMPTY_PROFILE}
+                for doc in self.collection.find({'_id': {'$in': misses}})
+            }
+            for customer_id in misses:
+                # Unknown customers are cached too, so new ids don't hit the database every batch
+                profile = found.get(customer_id, dict(EMPTY_PROFILE))
+                self.cache.set(customer_id, profile)
+                profiles[customer_id] = profile
+
+        return profiles
+
+    def segment(self, customer_ids):
+        """Customer segment per row, or None when there are no profiles to derive thresholds from"""
+        thresholds = self.get_thresholds()
+        if thresholds is None:
+            return None
+
+        profiles = self.get_profiles(customer_ids)
+        spent = customer_ids.map({c: p['total_spent'] for c, p in profiles.items()}).to_numpy(dtype=float)
+        counts = customer_ids.map({c: p['transaction_count'] for c, p in profiles.items()}).to_numpy(dtype=float)
+
+        # Same rules, in the same precedence, as the batch-level segmentation
+        segments = np.full(len(customer_ids), 'Regular', dtype=object)
+        segments[spent > thresholds['spent_80']] = 'VIP'
+        segments[counts > thresholds['count_90']] = 'Frequent'
+        segments[(spent > thresholds['spent_90']) & (counts > thresholds['count_80'])] = 'Champion'
+        return pd.Series(segments, index=customer_ids.index)
+
+    def record_batch(self, records):
+        """Fold a written batch into the lifetime profiles with one unordered bulk upsert"""
+        if not records:
+            return 0
+
+        df = pd.DataFrame({
+            'customer_id': [r['customer_id'] for r in records],
+            'value': [r['value'] for r in records],
+            'timestamp': [r['timestamp'] for r in records]
+        })
+        totals = df.groupby('customer_id').agg(
+            transaction_count=('value', 'size'),
+            total_spent=('value', 'sum'),
+            last_seen=('timestamp', 'max')
+        )
+
+        operations = []
+        deltas = []
+        for customer_id, count, spent, last_seen in zip(
+            totals.index, totals['transaction_count'], totals['total_spent'], totals['last_seen']
+        ):
+            count, spent, last_seen = int(count), float(spent), pd.Timestamp(last_seen).to_pydatetime()
+            operations.append(UpdateOne(
+                {'_id': customer_id},
+                {'$inc': {'transaction_count': count, 'total_spent': spent}, '$max': {'last_seen': last_seen}},
+                upsert=True
+            ))
+            deltas.append((customer_id, count, spent, last_seen))
+
+        self.collection.bulk_write(operations, ordered=False)
+        with self.lock:
+            self.records_since_refresh += len(records)
+
+        # Keep cached profiles in step with what was just written
+        for customer_id, count, spent, last_seen in deltas:
+            self.cache.update(customer_id, lambda p, c=count, s=spent, t=last_seen: {
+                'transaction_count': p['transaction_count'] + c,
+                'total_spent': p['total_spent'] + s,
+                'last_seen': max(p['last_seen'], t) if p['last_seen'] is not None else t
+            })
+        return len(operations)
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Chart datasets served under /api/<name>; all are computed by one $facet aggregation
+DATASETS = ['summary', 'daily_sales', 'categories', 'regions', 'hourly', 'distribution']
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Sales Analytics Dashboard</title>
+<script src="https://cdn.plot.ly/plotly-2.27.0.min.js"></script>
+<style>
+  body { font-family: sans-serif; margin: 20px; }
+  .grid { display: grid; grid-template-columns: 1fr 1fr; gap: 16px; }
+  .chart { height: 380px; }
+  #summary { font-size: 15px; margin-bottom: 12px; }
+</style>
+</head>
+<body>
+<h2>Sales Analytics Dashboard</h2>
+<div id="summary">Waiting for data...</div>
+<div class="grid">
+  <div id="daily_sales" class="chart"></div>
+  <div id="categories" class="chart"></div>
+  <div id="regions" class="chart"></div>
+  <div id="distribution" class="chart"></div>
+  <div id="hourly" class="chart"></div>
+</div>
+<script>
+const money = v => '$' + v.toLocaleString(undefined, {minimumFractionDigits: 2, maximumFractionDigits: 2});
+const render = {
+  summary: d => {
+    document.getElementById('summary').textContent =
+      `Total Sales: ${money(d.total_sales)} | Transactions: ${d.total_transactions.toLocaleString()} | ` +
+      `Avg: ${money(d.avg_transaction)} | Top Category: ${d.top_category} | Top Region: ${d.top_region}`;
+  },
+  daily_sales: d => Plotly.react('daily_sales', [{x: d.map(r => r.date), y: d.map(r => r.total_sales), mode: 'lines+markers'}],
+                                 {title: 'Daily Sales Trends'}),
+  categories: d => Plotly.react('categories', [{x: d.map(r => r.total_sales), y: d.map(r => r.category), type: 'bar', orientation: 'h'}],
+                                {title: 'Category Performance'}),
+  regions: d => Plotly.react('regions', [{labels: d.map(r => r.region), values: d.map(r => r.total_sales), type: 'pie'}],
+                             {title: 'Regional Distribution'}),
+  distribution: d => Plotly.react('distribution', [{x: d.map(r => (r.min + r.max) / 2), y: d.map(r => r.count), type: 'bar'}],
+                                  {title: 'Sales Value Distribution'}),
+  hourly: d => Plotly.react('hourly', [{x: d.map(r => r.hour), y: d.map(r => r.total_sales), type: 'bar'}],
+                            {title: 'Hourly Sales Pattern'})
+};
+const stream = new EventSource('/api/stream');
+Object.keys(render).forEach(name => stream.addEventListener(name, e => render[name](JSON.parse(e.data))));
+</script>
+</body>
+</html>
+"""
+
+
+# Exact integer cents per document: value_cents in cents mode, else the float value rounded to
+# cents (documents written before cents mode), as SalesDashboard sums them; dollars only in shape_results
+CENTS = {'$ifNull': ['$value_cents', {'$round': [{'$multiply': ['$value', 100]}, 0]}]}
+
+
+def facet_pipeline(histogram_buckets=30):
+    """The dashboard's chart aggregates as a single $facet, so a refresh is one round trip"""
+    return [{'$facet': {
+        'summary': [{'$group': {
+            '_id': None,
+            'total_cents': {'$sum': CENTS},
+            'total_transactions': {'$sum': 1},
+            'first_timestamp': {'$min': '$timestamp'},
+            'last_timestamp': {'$max': '$timestamp'}
+        }}],
+        'daily_sales': [
+            {'$group': {
+                '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp'}},
+                'total_cents': {'$sum': CENTS},
+                'transaction_count': {'$sum': 1}
+            }},
+            {'$sort': {'_id': 1}}
+        ],
+        'categories': [
+            {'$group': {'_id': '$category', 'total_cents': {'$sum': CENTS}, 'transaction_count': {'$sum': 1}}},
+            {'$sort': {'total_cents': 1}}
+        ],
+        'regions': [
+            {'$group': {'_id': '$region', 'total_cents': {'$sum': CENTS}, 'transaction_count': {'$sum': 1}}},
+            {'$sort': {'_id': 1}}
+        ],
+        'hourly': [
+            {'$group': {'_id': {'$ifNull': ['$hour', {'$hour': '$timestamp'}]}, 'total_cents': {'$sum': CENTS}}},
+            {'$sort': {'_id': 1}}
+        ],
+        'distribution': [
+            {'$bucketAuto': {'groupBy': '$value', 'buckets': histogram_buckets}}
+        ]
+    }}]
+
+
+def shape_results(facets):
+    """Turn raw $facet output into the JSON payload for each dataset, with sales in dollars"""
+    categories = [{'category': r['_id'], 'total_sales': r['total_cents'] / 100, 'transaction_count': r['transaction_count']}
+                  for r in facets['categories']]
+    regions = [{'region': r['_id'], 'total_sales': r['total_cents'] / 100, 'transaction_count': r['transaction_count']}
+               for r in facets['regions']]
+
+    summary = facets['summary'][0] if facets['summary'] else {}
+    first, last = summary.get('first_timestamp'), summary.get('last_timestamp')
+    total_sales = summary.get('total_cents', 0) / 100
+    transactions = summary.get('total_transactions', 0)
+    return {
+        'summary': {
+            'total_sales': total_sales,
+            'total_transactions': transactions,
+            'avg_transaction': total_sales / transactions if transactions else 0,
+            'date_range': f"{first.date()} to {last.date()}" if first and last else None,
+            'top_category': max(categories, key=lambda r: r['total_sales'])['category'] if categories else None,
+            'top_region': max(regions, key=lambda r: r['total_sales'])['region'] if regions else None
+        },
+        'daily_sales': [{'date': r['_id'], 'total_sales': r['total_cents'] / 100, 'transaction_count': r['transaction_count']}
+                        for r in facets['daily_sales']],
+        'categories': categories,
+        'regions': regions,
+        'hourly': [{'hour': r['_id'], 'total_sales': r['total_cents'] / 100} for r in facets['hourly']],
+        'distribution': [{'min': r['_id']['min'], 'max': r['_id']['max'], 'count': r['count']}
+                         for r in facets['distribution']]
+    }
+
+
+class DashboardCache:
+    """Chart datasets recomputed on a fixed interval and shared by every viewer
+
+    Each refresh runs one aggregation no matter how many clients are connected. A
+    dataset's version only advances when its serialized content changes, which is
+    what drives both ETag revalidation and the incremental SSE pushes.
+    """
+
+    def __init__(self, collection, refresh_interval=10):
+        self.collection = collection
+        self.refresh_interval = refresh_interval
+        self.entries = {}
+        self.version = 0
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def refresh(self):
+        """Run the aggregation and store whichever datasets changed; returns their names"""
+        facets = next(self.collection.aggregate(facet_pipeline(), allowDiskUse=True))
+        datasets = shape_results(facets)
+
+        changed = []
+        with self.condition:
+            for name, payload in datasets.items():
+                body = json.dumps(payload, default=str, separators=(',', ':')).encode()
+                etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+                entry = self.entries.get(name)
+                if entry is None or entry['etag'] != etag:
+                    changed.append(name)
+                    self.entries[name] = {'body': body, 'etag': etag, 'version': self.version + 1}
+
+            if changed:
+                self.version += 1
+                self.condition.notify_all()
+        return changed
+
+    def _run(self):
+        while not self.stop_event.wait(self.refresh_interval):
+            try:
+                changed = self.refresh()
+                if changed:
+                    print(f"🔄 Refreshed dashboard data ({', '.join(changed)})")
+            except Exception as e:
+                print(f"Dashboard refresh failed: {e}")
+
+    def start(self):
+        """Load the datasets once up front, then keep refreshing them in the background"""
+        self.refresh()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+
+    def get(self, name):
+        with self.condition:
+            return self.entries.get(name)
+
+    def changes_since(self, version, timeout):
+        """Block until datasets newer than version exist (or timeout); returns (version, {name: body})"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version > version or self.stop_event.is_set(), timeout=timeout)
+            changed = {name: entry['body'] for name, entry in self.entries.items() if entry['version'] > version}
+            return self.version, changed
+
+
+def make_handler(cache, keepalive=15):
+    class DashboardRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_body(self, status, body, content_type, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0].rstrip('/') or '/'
+            if path == '/':
+                self.send_body(200, PAGE.encode(), 'text/html; charset=utf-8')
+            elif path == '/api':
+                self.send_body(200, json.dumps({'datasets': DATASETS}).encode(), 'application/json')
+            elif path == '/api/stream':
+                self.stream()
+            elif path.startswith('/api/') and path[5:] in DATASETS:
+                self.dataset(path[5:])
+            else:
+                self.send_body(404, b'{"error":"not found"}', 'application/json')
+
+        def dataset(self, name):
+            entry = cache.get(name)
+            headers = {'ETag': entry['etag'], 'Cache-Control': 'no-cache'}
+            requested = [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]
+            if entry['etag'] in requested or '*' in requested:
+                self.send_response(304)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                return
+            self.send_body(200, entry['body'], 'application/json', headers)
+
+        def stream(self):
+            """Server-Sent Events: everything on connect, then only the datasets that change"""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+
+            # A reconnecting EventSource resumes from the last version it saw
+            last_event_id = self.headers.get('Last-Event-ID', '')
+            version = int(last_event_id) if last_event_id.isdigit() else 0
+            try:
+                while not cache.stop_event.is_set():
+                    version, changed = cache.changes_since(version, timeout=keepalive)
+                    if changed:
+                        for name, body in changed.items():
+                            self.wfile.write(f"id: {version}\nevent: {name}\ndata: ".encode() + body + b"\n\n")
+                    else:
+                        self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return DashboardRequestHandler
+
+
+def serve(collection, host='127.0.0.1', port=8050, refresh_interval=10):
+    """Serve the dashboard until interrupted"""
+    cache = DashboardCache(collection, refresh_interval)
+    cache.start()
+
+    server = ThreadingHTTPServer((host, port), make_handler(cache))
+    server.daemon_threads = True
+    print(f"📊 Dashboard server running at http://{host}:{port}/ (refresh every {refresh_interval}s)")
+    try:
+        server.serve_forever()
+    finally:
+        cache.stop()
+        server.server_close()
@@ -0,0 +1,339 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from bson import ObjectId
+import db_connection
+from data_ingest import DataIngestion
+from sales_schema import apply_categorical_schema
+from cli_options import parse_args
+
+class PartFile:
+    """One Parquet part written through .tmp files and published only once complete
+
+    A Parquet file has a single schema, fixed by its first batch. A later batch that adds
+    fields (older documents predate sample_key, rules_version and the *_cents fields) or
+    changes a field's type is written to a new file next to it, part-N-1.parquet, and so on,
+    so no column is ever dropped or truncated.
+    """
+
+    def __init__(self, path, compression):
+        self.path = path
+        self.compression = compression
+        self.writer = None
+        self.paths = []
+        self.rows = 0
+
+    def write(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is not None:
+            conformed = self.conform(table)
+            if conformed is None:
+                self.close()
+            else:
+                table = conformed
+        if self.writer is None:
+            root, extension = os.path.splitext(self.path)
+            path = f"{root}-{len(self.paths)}{extension}" if self.paths else self.path
+            self.paths.append(path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.writer = pq.ParquetWriter(f"{path}.tmp", table.schema, compression=self.compression)
+        self.writer.write_table(table)
+        self.rows += len(df)
+
+    def conform(self, table):
+        """Return table in the open file's schema, or None when it does not fit losslessly
+
+        Fields the batch lacks are written as nulls; a field the file lacks, or a value
+        that cannot be cast without loss, needs a new file.
+        """
+        import pyarrow as pa
+
+        schema = self.writer.schema
+        if set(table.column_names) - set(schema.names):
+            return None
+        columns = []
+        try:
+            for field in schema:
+                if field.name in table.column_names:
+                    columns.append(table.column(field.name).cast(field.type))
+                else:
+                    columns.append(pa.nulls(table.num_rows, field.type))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            return None
+        return pa.Table.from_arrays(columns, schema=schema)
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+    def publish(self):
+        """Move the finished files into place; returns rows written"""
+        if self.rows:
+            for path in self.paths:
+                os.replace(f"{path}.tmp", path)
+        return self.rows
+
+
+class ParquetExporter:
+    """Export sales_data into date-partitioned Parquet files, resumable by watermark
+
+    Each calendar day of `timestamp` is written to <output_dir>/date=YYYY-MM-DD/part-0.parquet.
+    Documents are also bounded by an insert watermark: an ObjectId cut taken insert_lag
+    seconds before the run, so only rows inserted before it are exported. Rows inserted
+    later into a day already exported (backdated bulk loads, file imports) are written by
+    the next run to an extra part-N.parquet in that day's partition.
+
+    The watermark file records the exported day range and the insert watermark, so a rerun
+    continues where the previous one stopped, and archival can select exactly the exported
+    documents: timestamp in the exported days and _id below the insert watermark.
+    """
+
+    def __init__(self, collection, output_dir='exports/sales_data', batch_size=50000, compression='zstd',
+                 insert_lag=60):
+        self.collection = collection
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.compression = compression
+        # ObjectIds carry the writer's clock; the lag leaves room for writers running slightly behind
+        self.insert_lag = insert_lag
+        self.watermark_path = os.path.join(output_dir, '_watermark.json')
+
+    def load_watermark(self):
+        """Return {'exported_from', 'exported_until': datetime|None, 'inserted_until': ObjectId|None}"""
+        state = {'exported_from': None, 'exported_until': None, 'inserted_until': None}
+        if os.path.exists(self.watermark_path):
+            with open(self.watermark_path) as f:
+                saved = json.load(f)
+            for key in ('exported_from', 'exported_until'):
+                if saved.get(key):
+                    state[key] = datetime.fromisoformat(saved[key])
+            if saved.get('inserted_until'):
+                state['inserted_until'] = ObjectId(saved['inserted_until'])
+        if state['exported_until'] and not state['inserted_until']:
+            # Written before insert tracking: which late rows were exported is unknown, so start over
+            print(" Watermark has no insert watermark; re-exporting from the first day")
+            state = {'exported_from': None, 'exported_until': None, 'inserted_until': None}
+        return state
+
+    def save_watermark(self, state):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = f"{self.watermark_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'exported_from': state['exported_from'].isoformat() if state['exported_from'] else None,
+                'exported_until': state['exported_until'].isoformat() if state['exported_until'] else None,
+                'inserted_until': str(state['inserted_until']) if state['inserted_until'] else None
+            }, f)
+        os.replace(tmp_path, self.watermark_path)
+
+    def prepare_frame(self, documents):
+        """Convert a batch of documents into a DataFrame with the schema's categorical columns
+
+        Labels outside the fixed dictionaries are kept as extra categories, not nulled.
+        """
+        df = pd.DataFrame(documents)
+        if '_id' in df.columns:
+            df['_id'] = df['_id'].astype(str)
+        return apply_categorical_schema(df, extend=True)
+
+    def partition_dir(self, day):
+        return os.path.join(self.output_dir, f"date={day:%Y-%m-%d}")
+
+    def part_paths(self, day):
+        directory = self.partition_dir(day)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                      if name.startswith('part-') and name.endswith('.parquet'))
+
+    def export_day(self, day_start, inserted_until):
+        """Stream one day of documents inserted before inserted_until into part-0; returns rows written
+
+        Late-row parts from earlier runs are removed first, since part-0 now holds their rows.
+        """
+        day_end = day_start + timedelta(days=1)
+        cursor = self.collection.find(
+            {'timestamp': {'$gte': day_start, '$lt': day_end}, '_id': {'$lt': inserted_until}},
+            batch_size=self.batch_size
+        )
+        for path in self.part_paths(day_start):
+            if os.path.basename(path) != 'part-0.parquet':
+                os.remove(path)
+
+        part = PartFile(os.path.join(self.partition_dir(day_start), 'part-0.parquet'), self.compression)
+        batch = []
+        try:
+            for document in cursor:
+                batch.append(document)
+                if len(batch) >= self.batch_size:
+                    part.write(self.prepare_frame(batch))
+                    batch = []
+            if batch:
+                part.write(self.prepare_frame(batch))
+        finally:
+            part.close()
+        return part.publish()
+
+    def export_late(self, start, end, inserted_from, inserted_until):
+        """Write rows inserted in [inserted_from, inserted_until) into exported days [start, end)
+
+        The _id range selects the late rows through the _id index; each day that got any is
+        given a new part-N.parquet. Returns {day: rows written}.
+        """
+        cursor = self.collection.find(
+            {'_id': {'$gte': inserted_from, '$lt': inserted_until}, 'timestamp': {'$gte': start, '$lt': end}},
+            batch_size=self.batch_size
+        )
+
+        parts, batches = {}, {}
+        try:
+            for document in cursor:
+                timestamp = document['timestamp']
+                day = datetime(timestamp.year, timestamp.month, timestamp.day)
+                batch = batches.setdefault(day, [])
+                batch.append(document)
+                if len(batch) >= self.batch_size:
+                    self.late_part(parts, day).write(self.prepare_frame(batch))
+                    batches[day] = []
+            for day, batch in batches.items():
+                if batch:
+                    self.late_part(parts, day).write(self.prepare_frame(batch))
+        finally:
+            for part in parts.values():
+                part.close()
+        return {day: part.publish() for day, part in sorted(parts.items())}
+
+    def late_part(self, parts, day):
+        if day not in parts:
+            path = os.path.join(self.partition_dir(day), f"part-{len(self.part_paths(day))}.parquet")
+            parts[day] = PartFile(path, self.compression)
+        return parts[day]
+
+    def archive(self, start, end, inserted_until, mode, ttl_seconds=0):
+        """Delete, or mark for TTL expiry, the exported documents of days [start, end)
+
+        Exported documents are exactly those in the exported days with an _id below the
+        insert watermark, so rows that arrived after their day was exported are kept until a
+        later run has written them out. Repeating an archive is harmless.
+        """
+        query = {'timestamp': {'$gte': start, '$lt': end}, '_id': {'$lt': inserted_until}}
+        if mode == 'delete':
+            result = self.collection.delete_many(query)
+            print(f"   Archived (deleted) {result.deleted_count:,} documents")
+        elif mode == 'ttl':
+            # TTL monitor removes documents once archived_at is older than ttl_seconds
+            self.collection.create_index([('archived_at', 1)], expireAfterSeconds=ttl_seconds)
+            query['archived_at'] = {'$exists': False}
+            result = self.collection.update_many(query, {'$set': {'archived_at': datetime.now(timezone.utc)}})
+            print(f"   Marked {result.modified_count:,} documents to expire in {ttl_seconds}s")
+
+    def export(self, start=None, end=None, archive=None, ttl_seconds=0):
+        """Export complete days from the watermark (or start) up to end; returns rows exported"""
+        state = self.load_watermark()
+        previous_inserted = state['inserted_until']
+        inserted_until = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=self.insert_lag))
+
+        if start is None:
+            start = state['exported_until']
+        if start is None:
+            first = self.collection.find_one({}, sort=[('timestamp', 1)], projection={'timestamp': 1})
+            if not first:
+                print("  No data found in database.")
+                return 0
+            start = first['timestamp']
+        start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        # Only whole days are exported, so today's partition is never half-written
+        if end is None:
+            end = db_connection.utc_now()
+        end = end.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        exported_from, exported_until = state['exported_from'], state['exported_until']
+        if exported_until is not None and not exported_from <= start <= exported_until:
+            # A gap or an earlier --start: only the range exported from here on is tracked
+            print(f" --start is outside the exported range {exported_from:%Y-%m-%d} to {exported_until:%Y-%m-%d}; "
+                  f"earlier days are no longer tracked for late rows or archival")
+            exported_from, exported_until, previous_inserted = None, None, None
+
+        print(f"Exporting sales_data from {start:%Y-%m-%d} to {end:%Y-%m-%d} into {self.output_dir}")
+        total_rows = 0
+        start_time = time.time()
+
+        # Rows inserted since the last run into days it had already exported
+        if previous_inserted is not None and exported_from < start:
+            late = self.export_late(exported_from, start, previous_inserted, inserted_until)
+            for day, day_rows in late.items():
+                print(f" {day:%Y-%m-%d}: {day_rows:,} late rows")
+            total_rows += sum(late.values())
+
+        if exported_until is not None:
+            # Everything up to start now carries the new insert watermark
+            state.update(exported_from=exported_from, exported_until=start, inserted_until=inserted_until)
+            self.save_watermark(state)
+            if archive:
+                self.archive(exported_from, start, inserted_until, archive, ttl_seconds)
+
+        day = start
+        while day < end:
+            day_rows = self.export_day(day, inserted_until)
+            total_rows += day_rows
+            print(f" {day:%Y-%m-%d}: {day_rows:,} rows")
+
+            # Advance the watermark before archiving; archival of the day is repeated next run if it fails
+            state.update(exported_from=exported_from or start, exported_until=day + timedelta(days=1),
+                         inserted_until=inserted_until)
+            self.save_watermark(state)
+
+            if archive:
+                self.archive(day, day + timedelta(days=1), inserted_until, archive, ttl_seconds)
+
+            day += timedelta(days=1)
+
+        elapsed = time.time() - start_time
+        print(f"Export Summary:")
+        print(f"   Rows exported: {total_rows:,}")
+        print(f"   Elapsed: {elapsed:.1f}s | {total_rows / elapsed if elapsed > 0 else 0:,.0f} rows/sec")
+        return total_rows
+
+
+def main():
+    """python data_export.py [output_dir] [--start=YYYY-MM-DD] [--end=YYYY-MM-DD] [--delete | --ttl=SECONDS]"""
+    args, options = parse_args()
+
+    output_dir = args[0] if args else 'exports/sales_data'
+    start = datetime.fromisoformat(options['start']) if options.get('start') else None
+    end = datetime.fromisoformat(options['end']) if options.get('end') else None
+
+    archive = None
+    ttl_seconds = 0
+    if 'delete' in options:
+        archive = 'delete'
+    elif 'ttl' in options:
+        archive = 'ttl'
+        ttl_seconds = int(options['ttl'] or 0)
+
+    ingestion = DataIngestion()
+    try:
+        if not ingestion.connect_database():
+            sys.exit(1)
+
+        exporter = ParquetExporter(ingestion.collection, output_dir)
+        exporter.export(start, end, archive, ttl_seconds)
+
+    except KeyboardInterrupt:
+        print("\nExport interrupted by user; rerun to resume from the watermark")
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+        sys.exit(1)
+    finally:
+        ingestion.close_connection()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+import pymongo
+
+# Defaults, overridden by a JSON config file (LINQ_DB_CONFIG) and then by environment variables
+DEFAULT_CONFIG = {
+    # Credentials never live in code: point MONGODB_URL or the config file at Atlas
+    'url': 'mongodb://localhost:27017',
+    'database': 'linq_assessment',
+    'server_selection_timeout_ms': 10000,
+    'max_pool_size': 50,
+    # No warm connections by default: most entry points are short-lived CLIs, and forked
+    # backfill workers would each open them; the generator can set MONGODB_MIN_POOL_SIZE=5
+    'min_pool_size': 0,
+    'max_idle_time_ms': 30000,
+    'wait_queue_timeout_ms': 5000
+}
+
+ENV_VARS = {
+    'url': 'MONGODB_URL',
+    'database': 'MONGODB_DATABASE',
+    'server_selection_timeout_ms': 'MONGODB_SERVER_SELECTION_TIMEOUT_MS',
+    'max_pool_size': 'MONGODB_MAX_POOL_SIZE',
+    'min_pool_size': 'MONGODB_MIN_POOL_SIZE',
+    'max_idle_time_ms': 'MONGODB_MAX_IDLE_TIME_MS',
+    'wait_queue_timeout_ms': 'MONGODB_WAIT_QUEUE_TIMEOUT_MS'
+}
+
+CONFIG_FILE_ENV = 'LINQ_DB_CONFIG'
+
+# Indexes the Python writers rely on for the sales collection
+SALES_INDEXES = [
+    [('timestamp', -1)],
+    [('customer_id', 1)],
+    [('category', 1), ('region', 1)]
+]
+
+
+def utc_now():
+    """Current time as a naive UTC datetime, the form pymongo stores and returns dates in
+
+    Every writer stamps sales timestamps with this, so in-process values compare directly
+    with values read back from MongoDB, and the Node API's Date queries see the same instants.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+_lock = threading.RLock()
+_state = {
+    'client': None,
+    'pid': None,
+    'database': None,
+    'users': 0,
+    'verified': False,
+    'ensured_indexes': set()
+}
+
+
+def load_config(path=None):
+    """Resolve connection settings: defaults, then config file, then environment"""
+    config = dict(DEFAULT_CONFIG)
+
+    path = path or os.environ.get(CONFIG_FILE_ENV)
+    if path:
+        with open(path) as f:
+            config.update(json.load(f))
+
+    for key, env_var in ENV_VARS.items():
+        if env_var in os.environ:
+            value = os.environ[env_var]
+            config[key] = int(value) if isinstance(DEFAULT_CONFIG[key], int) else value
+    return config
+
+
+def _reset_after_fork():
+    """Children must not reuse the parent's sockets; drop the reference and reconnect lazily"""
+    _state.update({'client': None, 'pid': None, 'users': 0, 'verified': False})
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_client(max_pool_size=None):
+    """Return this process's shared MongoClient, creating it on first use
+
+    No network round trip happens here; pymongo connects in the background and the
+    first operation waits for server selection. max_pool_size only applies when the
+    client is created, so size it in whichever component connects first.
+    """
+    with _lock:
+        if _state['client'] is not None and _state['pid'] != os.getpid():
+            # Fallback for forks that bypassed register_at_fork
+            _reset_after_fork()
+
+        if _state['client'] is None:
+            config = load_config()
+            _state['client'] = pymongo.MongoClient(
+                config['url'],
+                serverSelectionTimeoutMS=config['server_selection_timeout_ms'],
+                maxPoolSize=max(max_pool_size or 0, config['max_pool_size']),
+                minPoolSize=config['min_pool_size'],
+                maxIdleTimeMS=config['max_idle_time_ms'],
+                waitQueueTimeoutMS=config['wait_queue_timeout_ms']
+            )
+            _state['pid'] = os.getpid()
+            _state['database'] = config['database']
+        return _state['client']
+
+
+def get_database(name=None):
+    client = get_client()
+    return client[name or _state['database']]
+
+
+def acquire(max_pool_size=None):
+    """Register a component as a user of the shared client"""
+    with _lock:
+        client = get_client(max_pool_size)
+        _state['users'] += 1
+        return client
+
+
+def release():
+    """Unregister a component; the client is closed once no component uses it"""
+    with _lock:
+        if _state['client'] is None or _state['pid'] != os.getpid():
+            return False
+        _state['users'] = max(0, _state['users'] - 1)
+        if _state['users'] > 0:
+            return False
+
+        _state['client'].close()
+        _state.update({'client': None, 'pid': None, 'verified': False})
+        return True
+
+
+def verify_connection():
+    """Ping the server once per process so startup fails fast on a bad connection"""
+    with _lock:
+        if _state['verified'] and _state['pid'] == os.getpid():
+            return
+    get_client().admin.command('ping')
+    with _lock:
+        _state['verified'] = True
+
+
+def existing_indexes(collection):
+    """Key lists of the collection's indexes, as tuples of (field, direction)"""
+    return {
+        tuple((field, int(direction) if isinstance(direction, (int, float)) else direction)
+              for field, direction in index['key'].items())
+        for index in collection.list_indexes()
+    }
+
+
+def ensure_indexes(collection, indexes=SALES_INDEXES):
+    """Create only the indexes that are missing; checked once per collection per process"""
+    cache_key = (collection.database.name, collection.name)
+    with _lock:
+        if cache_key in _state['ensured_indexes']:
+            return 0
+
+    existing = existing_indexes(collection)
+    created = 0
+    for keys in indexes:
+        if tuple(keys) not in existing:
+            collection.create_index(keys)
+            created += 1
+
+    with _lock:
+        _state['ensured_indexes'].add(cache_key)
+    return created
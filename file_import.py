@@ -0,0 +1,211 @@
+import os
+import queue
+import sys
+import threading
+import time
+import pandas as pd
+from data_ingest import DataIngestion
+from sales_schema import REQUIRED_FIELDS
+from cli_options import parse_args
+
+SUPPORTED_FORMATS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.parquet': 'parquet'
+}
+
+# Marks the end of a stage's output on its queue
+_DONE = object()
+
+
+def detect_format(path):
+    """Infer the file format from its extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported file type '{extension}'; expected one of {sorted(SUPPORTED_FORMATS)}")
+    return SUPPORTED_FORMATS[extension]
+
+
+def read_chunks(handle, file_format, chunk_size):
+    """Yield DataFrames of at most chunk_size rows from an open binary file"""
+    if file_format == 'csv':
+        yield from pd.read_csv(handle, chunksize=chunk_size)
+    elif file_format == 'jsonl':
+        yield from pd.read_json(handle, lines=True, chunksize=chunk_size)
+    elif file_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet import requires pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(handle).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+class FileImporter:
+    """Stream CSV, JSONL or Parquet exports through the transform pipeline into MongoDB
+
+    Reading, transforming and writing run as three threads connected by bounded queues,
+    so at most a few chunks are held in memory regardless of file size.
+    """
+
+    def __init__(self, ingestion, chunk_size=50000, insert_batch_size=5000, queue_depth=2):
+        self.ingestion = ingestion
+        # Recorded transactions are validated but never trimmed as outliers: a 3-sigma cut per
+        # chunk would drop real large sales, and more of them on every re-import
+        self.transformer = ingestion.make_transformer(verbose=False, drop_outliers=False)
+        self.chunk_size = chunk_size
+        self.insert_batch_size = insert_batch_size
+        self.queue_depth = queue_depth
+
+        self.stats = {'rows_read': 0, 'rows_written': 0, 'bytes_read': 0}
+        # Bytes consumed are only meaningful for text formats; Parquet reads decompress row groups
+        self.report_bytes = True
+        self.stats_lock = threading.Lock()
+        self.errors = []
+        self.stop_event = threading.Event()
+
+    def _put(self, out_queue, item):
+        """Block on a full queue, but give up once another stage has failed"""
+        while not self.stop_event.is_set():
+            try:
+                out_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, in_queue):
+        while not self.stop_event.is_set():
+            try:
+                return in_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _reader(self, path, file_format, out_queue):
+        try:
+            with open(path, 'rb') as handle:
+                for chunk in read_chunks(handle, file_format, self.chunk_size):
+                    with self.stats_lock:
+                        self.stats['rows_read'] += len(chunk)
+                        if self.report_bytes:
+                            self.stats['bytes_read'] = handle.tell()
+                    if not self._put(out_queue, chunk):
+                        return
+        except Exception as e:
+            self.errors.append(f"read: {e}")
+            self.stop_event.set()
+        finally:
+            self._put(out_queue, _DONE)
+
+    def _transformer(self, in_queue, out_queue):
+        try:
+            while True:
+                chunk = self._get(in_queue)
+                if chunk is _DONE:
+                    break
+                # Only the raw fields: files written by the pipeline (JSONL sink, Parquet export)
+                # already carry derived columns, which the transformer would add a second time
+                chunk = chunk[[field for field in REQUIRED_FIELDS if field in chunk]]
+                transformed_data, _ = self.transformer.transform_pipeline(chunk)
+                if transformed_data and not self._put(out_queue, transformed_data):
+                    return
+        except Exception as e:
+            self.errors.append(f"transform: {e}")
+            self.stop_event.set()
+        finally:
+            self._put(out_queue, _DONE)
+
+    def _writer(self, in_queue, start_time):
+        try:
+            while True:
+                records = self._get(in_queue)
+                if records is _DONE:
+                    break
+                for i in range(0, len(records), self.insert_batch_size):
+                    inserted_count = self.ingestion.write_documents(records[i:i + self.insert_batch_size])
+                    with self.stats_lock:
+                        self.stats['rows_written'] += inserted_count
+                self.report_progress(start_time)
+        except Exception as e:
+            self.errors.append(f"write: {e}")
+            self.stop_event.set()
+
+    def report_progress(self, start_time, label="⏳"):
+        elapsed = time.time() - start_time
+        with self.stats_lock:
+            stats = dict(self.stats)
+        rows_per_sec = stats['rows_read'] / elapsed if elapsed > 0 else 0
+        throughput = f"{rows_per_sec:,.0f} rows/sec"
+        if self.report_bytes:
+            mb_per_sec = stats['bytes_read'] / (1024 * 1024) / elapsed if elapsed > 0 else 0
+            throughput += f" | {mb_per_sec:.1f} MB/sec"
+        print(f"{label} Read: {stats['rows_read']:,} | Written: {stats['rows_written']:,} | {throughput}")
+
+    def import_file(self, path, file_format=None):
+        """Import a file end-to-end; returns the number of documents written"""
+        file_format = file_format or detect_format(path)
+        self.report_bytes = file_format != 'parquet'
+        file_size = os.path.getsize(path)
+        print(f"Importing {path} ({file_format}, {file_size / (1024 * 1024):,.1f} MB) "
+              f"in chunks of {self.chunk_size:,} rows")
+
+        parsed = queue.Queue(maxsize=self.queue_depth)
+        transformed = queue.Queue(maxsize=self.queue_depth)
+        start_time = time.time()
+
+        stages = [
+            threading.Thread(target=self._reader, args=(path, file_format, parsed), daemon=True),
+            threading.Thread(target=self._transformer, args=(parsed, transformed), daemon=True),
+            threading.Thread(target=self._writer, args=(transformed, start_time), daemon=True)
+        ]
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+
+        print(f"Import Summary:")
+        self.report_progress(start_time, label="  ")
+        print(f"   Rejected by cleaning/validation: {self.stats['rows_read'] - self.stats['rows_written']:,}")
+        print(f"   Elapsed: {time.time() - start_time:.1f}s")
+        for error in self.errors:
+            print(f" Import error ({error})")
+
+        return self.stats['rows_written']
+
+
+def main():
+    """python file_import.py <path> [chunk_size] [--timeseries] [--profiles] [--activity] [--heavy-hitters] [--sink=] [--cents]"""
+    args, options = parse_args()
+    if not args:
+        print("Usage: python file_import.py <file.csv|file.jsonl|file.parquet> [chunk_size] [--timeseries] [--profiles] [--activity] [--heavy-hitters] [--sink=] [--cents]")
+        sys.exit(1)
+
+    path = args[0]
+    chunk_size = int(args[1]) if len(args) > 1 else 50000
+
+    ingestion = DataIngestion(
+        timeseries='timeseries' in options, profiles='profiles' in options, activity='activity' in options,
+        sink=options.get('sink', 'mongo'), cents='cents' in options, heavy_hitters='heavy-hitters' in options
+    )
+    try:
+        if not ingestion.connect_database():
+            sys.exit(1)
+
+        importer = FileImporter(ingestion, chunk_size=chunk_size)
+        importer.import_file(path)
+
+        if importer.errors:
+            sys.exit(1)
+
+    except KeyboardInterrupt:
+        print("\nImport interrupted by user")
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+        sys.exit(1)
+    finally:
+        ingestion.close_connection()
+
+if __name__ == "__main__":
+    main()
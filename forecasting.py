@@ -0,0 +1,281 @@
+import math
+import sys
+from datetime import datetime, timedelta, timezone
+from pymongo import ReplaceOne
+from cli_options import parse_args
+
+FORECAST_COLLECTION = 'forecast_state'
+
+# Granularity -> (period length, seasonal cycle lengths in periods)
+GRANULARITIES = {
+    'hour': (timedelta(hours=1), (24, 168)),
+    'day': (timedelta(days=1), (7,))
+}
+
+# Period numbers count from a Monday midnight, so seasonal slot i is the same
+# hour-of-day / hour-of-week / day-of-week in every run
+EPOCH = datetime(2024, 1, 1)
+
+Z_95 = 1.96
+
+# Bulk loads and file imports spread timestamps over the past 30 days, so every refresh
+# re-aggregates this window and refits it from the model state saved at its start
+LOOKBACK = timedelta(days=31)
+
+
+def period_number(timestamp, step):
+    return int((timestamp - EPOCH) // step)
+
+
+def period_start(number, step):
+    return EPOCH + number * step
+
+
+class HoltWinters:
+    """Additive Holt-Winters with any number of seasonal cycles, updated one period at a time
+
+    State is a level, a trend, one array per seasonal cycle and an exponentially weighted
+    variance of the one-step errors, so each update is O(1) and the whole model is a small
+    dict. Updates use the error-correction form:
+
+        e = y - (level + trend + sum(season_k[t mod m_k]))
+        level += trend + alpha * e;  trend += alpha * beta * e;  season_k[t mod m_k] += gamma_k * e
+    """
+
+    def __init__(self, seasons, alpha=0.2, beta=0.01, gammas=None, variance_decay=0.05):
+        self.seasons = tuple(seasons)
+        self.alpha = alpha
+        self.beta = beta
+        self.gammas = tuple(gammas) if gammas else tuple(0.15 / (k + 1) for k in range(len(self.seasons)))
+        self.variance_decay = variance_decay
+        self.level = None
+        self.trend = 0.0
+        self.seasonals = [[0.0] * m for m in self.seasons]
+        self.variance = 0.0
+        self.next_period = None
+        self.observations = 0
+
+    def initialize(self, start, values):
+        """Seed level and seasonal indices from the first (longest) cycle of history"""
+        cycle = values[:max(self.seasons)] if self.seasons else values[:1]
+        self.level = sum(cycle) / len(cycle)
+        residuals = [value - self.level for value in cycle]
+        for m, seasonal in zip(self.seasons, self.seasonals):
+            sums, counts = [0.0] * m, [0] * m
+            for offset, residual in enumerate(residuals):
+                sums[(start + offset) % m] += residual
+                counts[(start + offset) % m] += 1
+            for slot in range(m):
+                seasonal[slot] = sums[slot] / counts[slot] if counts[slot] else 0.0
+            residuals = [residual - seasonal[(start + offset) % m] for offset, residual in enumerate(residuals)]
+        self.next_period = start
+
+    def seasonal_sum(self, period):
+        return sum(seasonal[period % m] for m, seasonal in zip(self.seasons, self.seasonals))
+
+    def update(self, period, value):
+        """Fold in the observation for period (which must be next_period)"""
+        if self.level is None:
+            self.initialize(period, [value])
+        error = value - (self.level + self.trend + self.seasonal_sum(period))
+        self.level += self.trend + self.alpha * error
+        self.trend += self.alpha * self.beta * error
+        for m, seasonal, gamma in zip(self.seasons, self.seasonals, self.gammas):
+            seasonal[period % m] += gamma * error
+
+        if self.observations == 0:
+            self.variance = error * error
+        else:
+            self.variance += self.variance_decay * (error * error - self.variance)
+        self.observations += 1
+        self.next_period = period + 1
+
+    def forecast(self, horizon, z=Z_95):
+        """[(period, point, lower, upper)] for the next horizon periods
+
+        The h-step variance is sigma^2 * (1 + sum of c_j^2 for j < h), with
+        c_j = alpha * (1 + beta * j) + gamma_k for each cycle m_k dividing j.
+        """
+        results = []
+        spread = 1.0
+        for h in range(1, horizon + 1):
+            period = self.next_period + h - 1
+            point = self.level + h * self.trend + self.seasonal_sum(period)
+            if h > 1:
+                j = h - 1
+                c = self.alpha * (1 + self.beta * j)
+                c += sum(gamma for m, gamma in zip(self.seasons, self.gammas) if j % m == 0)
+                spread += c * c
+            half_width = z * math.sqrt(self.variance * spread)
+            results.append((period, point, point - half_width, point + half_width))
+        return results
+
+    def to_state(self):
+        return {
+            'seasons': list(self.seasons), 'alpha': self.alpha, 'beta': self.beta,
+            'gammas': list(self.gammas), 'variance_decay': self.variance_decay,
+            'level': self.level, 'trend': self.trend, 'seasonals': self.seasonals,
+            'variance': self.variance, 'next_period': self.next_period, 'observations': self.observations
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        model = cls(state['seasons'], state['alpha'], state['beta'], state['gammas'], state['variance_decay'])
+        model.level = state['level']
+        model.trend = state['trend']
+        model.seasonals = [list(seasonal) for seasonal in state['seasonals']]
+        model.variance = state['variance']
+        model.next_period = state['next_period']
+        model.observations = state['observations']
+        return model
+
+
+class SalesForecaster:
+    """Per-series Holt-Winters models over rolled-up sales, persisted between runs
+
+    Series are total sales overall ('all'), per category ('category:<name>') and per
+    region ('region:<name>'). Each series keeps two models: the current one, and a settled
+    one that has seen only the periods older than the lookback window. refresh()
+    aggregates the window and any newer complete periods, advances the settled model to
+    the new window start and replays the window onto a copy of it, so rows backdated into
+    the window are picked up while older history is never refitted; periods without sales
+    count as zero.
+    """
+
+    def __init__(self, state_collection, granularity='day', lookback=LOOKBACK):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}'; choose one of {', '.join(GRANULARITIES)}")
+        self.state_collection = state_collection
+        self.granularity = granularity
+        self.step, self.seasons = GRANULARITIES[granularity]
+        self.lookback_periods = lookback // self.step
+        self.models = {}
+        self.settled = {}
+
+    def load(self):
+        self.models, self.settled = {}, {}
+        for document in self.state_collection.find({'granularity': self.granularity}):
+            self.models[document['series']] = HoltWinters.from_state(document['state'])
+            # State saved before the lookback window settles from its current model
+            self.settled[document['series']] = HoltWinters.from_state(document.get('settled', document['state']))
+        return self
+
+    def save(self):
+        operations = [
+            ReplaceOne(
+                {'_id': f"{self.granularity}:{series}"},
+                {'granularity': self.granularity, 'series': series, 'state': model.to_state(),
+                 'settled': self.settled[series].to_state(), 'updated_at': datetime.now(timezone.utc)},
+                upsert=True
+            )
+            for series, model in self.models.items()
+        ]
+        if operations:
+            self.state_collection.bulk_write(operations, ordered=False)
+
+    def period_totals(self, sales_collection, start, end):
+        """{series: {period: total}} for complete periods in [start, end)"""
+        match = {'timestamp': {'$lt': end}}
+        if start is not None:
+            match['timestamp']['$gte'] = start
+        pipeline = [
+            {'$match': match},
+            {'$group': {
+                '_id': {
+                    'period': {'$dateTrunc': {'date': '$timestamp', 'unit': self.granularity}},
+                    'category': '$category',
+                    'region': '$region'
+                },
+                'total': {'$sum': '$value'}
+            }}
+        ]
+        totals = {}
+        for row in sales_collection.aggregate(pipeline, allowDiskUse=True):
+            period = period_number(row['_id']['period'], self.step)
+            for series in ('all', f"category:{row['_id']['category']}", f"region:{row['_id']['region']}"):
+                series_totals = totals.setdefault(series, {})
+                series_totals[period] = series_totals.get(period, 0.0) + row['total']
+        return totals
+
+    def refresh(self, sales_collection, now=None):
+        """Refit the lookback window and add every newer complete period; returns periods added"""
+        # Stored timestamps are naive UTC, so periods are counted on the UTC clock
+        end_period = period_number(now or datetime.now(timezone.utc).replace(tzinfo=None), self.step)
+        if self.models and min(model.next_period for model in self.models.values()) >= end_period:
+            return 0
+        settle_period = end_period - self.lookback_periods
+        pending = [model.next_period for model in self.settled.values()]
+        start_period = min(pending) if pending else None
+
+        totals = self.period_totals(
+            sales_collection,
+            period_start(start_period, self.step) if start_period is not None else None,
+            period_start(end_period, self.step)
+        )
+
+        for series, series_totals in totals.items():
+            if series not in self.settled:
+                first = min(series_totals)
+                settled = self.settled[series] = HoltWinters(self.seasons)
+                settled.initialize(first, [series_totals.get(p, 0.0) for p in range(first, end_period)])
+                self.models[series] = HoltWinters.from_state(settled.to_state())
+
+        added = 0
+        for series, settled in self.settled.items():
+            series_totals = totals.get(series, {})
+            for period in range(settled.next_period, settle_period):
+                settled.update(period, series_totals.get(period, 0.0))
+            added += max(0, end_period - self.models[series].next_period)
+            model = self.models[series] = HoltWinters.from_state(settled.to_state())
+            for period in range(model.next_period, end_period):
+                model.update(period, series_totals.get(period, 0.0))
+        self.save()
+        return added
+
+    def forecast(self, series='all', horizon=24, z=Z_95):
+        """[{'period', 'forecast', 'lower', 'upper'}] for the next horizon periods of a series"""
+        model = self.models.get(series)
+        if model is None or model.observations == 0:
+            return []
+        return [
+            {'period': period_start(period, self.step), 'forecast': point,
+             'lower': max(0.0, lower), 'upper': max(0.0, upper)}
+            for period, point, lower, upper in model.forecast(horizon, z)
+        ]
+
+
+def main():
+    """python forecasting.py [series] [horizon] [--granularity=day|hour] [--timeseries]"""
+    import db_connection
+    from timeseries_storage import get_sales_collection
+
+    args, options = parse_args()
+    series = args[0] if args else 'all'
+    horizon = int(args[1]) if len(args) > 1 else 7
+
+    db_connection.acquire()
+    try:
+        db = db_connection.get_database()
+        forecaster = SalesForecaster(db[FORECAST_COLLECTION], options.get('granularity', 'day')).load()
+        added = forecaster.refresh(get_sales_collection(db, 'timeseries' in options, create=False))
+        print(f" Updated {len(forecaster.models)} series with {added:,} new periods "
+              f"(last {forecaster.lookback_periods} re-aggregated)")
+
+        rows = forecaster.forecast(series, horizon)
+        if not rows:
+            print(f" No history for series '{series}'; choose one of {', '.join(sorted(forecaster.models))}")
+            sys.exit(1)
+        print(f"\n {'period':<20} {'forecast':>12} {'95% interval':>27}")
+        for row in rows:
+            print(f" {row['period']:%Y-%m-%d %H:%M}     {row['forecast']:>12,.2f}   "
+                  f"[{row['lower']:>11,.2f}, {row['upper']:>11,.2f}]")
+    except KeyboardInterrupt:
+        print("\n Forecast interrupted by user")
+    except Exception as e:
+        print(f" Forecast failed: {e}")
+        sys.exit(1)
+    finally:
+        db_connection.release()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timezone
+
+SUMMARY_COLLECTION = 'sales_summary'
+SUMMARY_ID = 'heavy_hitters'
+
+# Window name -> (length in seconds, number of sub-window buckets)
+DEFAULT_WINDOWS = {'5m': (300, 10), '1h': (3600, 12)}
+
+DIMENSIONS = {
+    'customers': lambda record: record['customer_id'],
+    'categories': lambda record: record['category'],
+    'category_region': lambda record: f"{record['category']}|{record['region']}"
+}
+
+MEASURES = {
+    'revenue': lambda record: record['value'],
+    'count': lambda record: 1
+}
+
+
+class SpaceSaving:
+    """Weighted Space-Saving sketch: the heaviest keys of a stream in at most capacity counters
+
+    A new key arriving when the sketch is full replaces the key with the smallest count
+    and inherits that count as its error, so every reported count overestimates the true
+    weight by at most its error, and any key heavier than total / capacity is kept.
+    The minimum is found through a lazily updated heap instead of a scan.
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.counters = {}
+        self.heap = []
+
+    def update(self, key, weight=1):
+        counter = self.counters.get(key)
+        if counter is None:
+            if len(self.counters) < self.capacity:
+                counter = self.counters[key] = [0, 0]
+            else:
+                floor = self.pop_min()
+                counter = self.counters[key] = [floor, floor]
+        counter[0] += weight
+        heapq.heappush(self.heap, (counter[0], key))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(count, key) for key, (count, _) in self.counters.items()]
+            heapq.heapify(self.heap)
+
+    def pop_min(self):
+        """Evict the key with the smallest count and return that count"""
+        while True:
+            count, key = heapq.heappop(self.heap)
+            counter = self.counters.get(key)
+            # Heap entries are stale once their key has been incremented or evicted
+            if counter is not None and counter[0] == count:
+                del self.counters[key]
+                return count
+
+    @property
+    def floor(self):
+        """Upper bound on the weight of any key the sketch is not tracking"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+
+class SlidingTopK:
+    """Space-Saving sketches over a ring of sub-window buckets, merged on read
+
+    Updates go to the bucket for the current time; buckets older than the window are
+    dropped as time advances, so memory is fixed at buckets x capacity counters and the
+    window slides in steps of one bucket.
+    """
+
+    def __init__(self, window_seconds, buckets, capacity=256):
+        self.bucket_seconds = window_seconds / buckets
+        self.buckets = buckets
+        self.capacity = capacity
+        self.ring = {}
+
+    def update(self, key, weight, now):
+        index = int(now // self.bucket_seconds)
+        sketch = self.ring.get(index)
+        if sketch is None:
+            sketch = self.ring[index] = SpaceSaving(self.capacity)
+            for old in [i for i in self.ring if i <= index - self.buckets]:
+                del self.ring[old]
+        sketch.update(key, weight)
+
+    def top(self, n, now):
+        """[(key, estimate, error)] of the n heaviest keys in the window ending at now"""
+        current = int(now // self.bucket_seconds)
+        live = [sketch for index, sketch in self.ring.items() if index > current - self.buckets]
+        totals = {}
+        for sketch in live:
+            for key, (count, error) in sketch.counters.items():
+                total = totals.setdefault(key, [0, 0])
+                total[0] += count
+                total[1] += error
+        # A key missing from a bucket may still have weighed up to that bucket's floor there
+        for sketch in live:
+            floor = sketch.floor
+            if floor:
+                for key, total in totals.items():
+                    if key not in sketch.counters:
+                        total[0] += floor
+                        total[1] += floor
+        ranked = heapq.nlargest(n, totals.items(), key=lambda item: item[1][0])
+        return [(key, count, error) for key, (count, error) in ranked]
+
+
+class HeavyHitterTracker:
+    """Top customers, categories and category x region by revenue and count, in fixed memory
+
+    Fed every written batch through record_batch, like the other write-path listeners.
+    Leaderboards for each sliding window are published to a single summary document
+    (sales_summary/heavy_hitters) at most every publish_interval seconds, so dashboards
+    read them with one _id lookup instead of grouping raw sales.
+    """
+
+    def __init__(self, collection, windows=None, top_n=10, capacity=256, publish_interval=5):
+        self.collection = collection
+        self.windows = windows or DEFAULT_WINDOWS
+        self.top_n = top_n
+        self.publish_interval = publish_interval
+        self.last_publish = 0
+        self.lock = threading.Lock()
+        self.sketches = {
+            (window, dimension, measure): SlidingTopK(seconds, buckets, capacity)
+            for window, (seconds, buckets) in self.windows.items()
+            for dimension in DIMENSIONS
+            for measure in MEASURES
+        }
+
+    def record_batch(self, records, now=None):
+        """Fold a written batch into the sketches; publishes when the interval has passed"""
+        now = now if now is not None else time.time()
+        with self.lock:
+            for (_, dimension, measure), sketch in self.sketches.items():
+                key_of, weight_of = DIMENSIONS[dimension], MEASURES[measure]
+                for record in records:
+                    sketch.update(key_of(record), weight_of(record), now)
+
+        if now - self.last_publish >= self.publish_interval:
+            self.publish(now)
+        return len(records)
+
+    def flush(self):
+        """Publish what the last interval added, so stopping a writer loses no leaderboard update"""
+        self.publish()
+
+    def leaderboards(self, now=None):
+        now = now if now is not None else time.time()
+        result = {}
+        with self.lock:
+            for (window, dimension, measure), sketch in self.sketches.items():
+                board = result.setdefault(window, {}).setdefault(dimension, {})
+                board[measure] = [
+                    {'key': key, measure: round(value, 2), 'error': round(error, 2)}
+                    for key, value, error in sketch.top(self.top_n, now)
+                ]
+        return result
+
+    def publish(self, now=None):
+        now = now if now is not None else time.time()
+        self.last_publish = now
+        document = {
+            'updated_at': datetime.fromtimestamp(now, timezone.utc),
+            'windows': self.leaderboards(now)
+        }
+        self.collection.replace_one({'_id': SUMMARY_ID}, document, upsert=True)
+        return document
+
+
+def read_leaderboards(db):
+    """The published leaderboards (None until a tracker has published)"""
+    return db[SUMMARY_COLLECTION].find_one({'_id': SUMMARY_ID})
+
+
+def top_entries(document, window='1h', dimension='customers', measure='revenue', n=3):
+    """The first n entries of one published leaderboard ([] when it is missing)"""
+    if not document:
+        return []
+    return document.get('windows', {}).get(window, {}).get(dimension, {}).get(measure, [])[:n]
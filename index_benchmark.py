@@ -0,0 +1,298 @@
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from data_ingest import DataIngestion
+import db_connection
+from db_connection import utc_now
+from transformations import DataTransformer
+from cli_options import parse_args
+
+# Candidate index sets: what the generator creates today, what models/SalesData.js declares,
+# and a set shaped after the queries below (equality fields first, then the timestamp sort/range)
+INDEX_SETS = {
+    'none': [],
+    'generator': [
+        [('timestamp', -1)],
+        [('customer_id', 1)],
+        [('category', 1), ('region', 1)]
+    ],
+    'mongoose': [
+        [('timestamp', 1)],
+        [('category', 1)],
+        [('region', 1)],
+        [('customer_id', 1)],
+        [('timestamp', 1), ('category', 1)],
+        [('region', 1), ('category', 1)]
+    ],
+    'proposed': [
+        [('timestamp', -1)],
+        [('category', 1), ('timestamp', -1)],
+        [('region', 1), ('category', 1), ('timestamp', -1)]
+    ]
+}
+
+
+def build_queries(now):
+    """The read queries the project actually issues, as (name, kind, spec) tuples"""
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    five_min_ago = now - timedelta(minutes=5)
+    thirty_days_ago = now - timedelta(days=30)
+    week_ago = now - timedelta(days=7)
+
+    return [
+        # visualization.py SalesDashboard.fetch_data
+        ('dashboard.count', 'count', {'filter': {}}),
+        ('dashboard.fetch_all', 'find', {'filter': {}}),
+
+        # realtime_dashboard.js getOptimizedStats $facet branches
+        ('realtime.total_count', 'aggregate', [{'$group': {'_id': None, 'total_count': {'$sum': 1}}}]),
+        ('realtime.today_stats', 'aggregate', [
+            {'$match': {'timestamp': {'$gte': today}}},
+            {'$group': {'_id': None, 'revenue': {'$sum': '$value'}, 'count': {'$sum': 1}}}
+        ]),
+        ('realtime.recent_5min', 'aggregate', [
+            {'$match': {'timestamp': {'$gte': five_min_ago}}},
+            {'$group': {'_id': None, 'count': {'$sum': 1}}}
+        ]),
+        ('realtime.top_categories', 'aggregate', [
+            {'$match': {'timestamp': {'$gte': today}}},
+            {'$group': {'_id': '$category', 'total': {'$sum': '$value'}}},
+            {'$sort': {'total': -1}},
+            {'$limit': 5}
+        ]),
+
+        # controllers/salesController.js
+        ('api.list_latest', 'find', {'filter': {}, 'sort': [('timestamp', -1)], 'limit': 100}),
+        ('api.list_by_category', 'find', {
+            'filter': {'category': 'Electronics'}, 'sort': [('timestamp', -1)], 'limit': 100
+        }),
+        ('api.list_by_region_category', 'find', {
+            'filter': {'region': 'East', 'category': 'Books'}, 'sort': [('timestamp', -1)], 'limit': 100
+        }),
+        ('api.count_by_category', 'count', {'filter': {'category': 'Electronics'}}),
+        ('api.summary_category_week', 'aggregate', [
+            {'$match': {'category': 'Electronics', 'timestamp': {'$gte': week_ago}}},
+            {'$group': {'_id': None, 'totalSales': {'$sum': '$value'}, 'totalTransactions': {'$sum': 1}}}
+        ]),
+        ('api.recent_trends', 'aggregate', [
+            {'$match': {'timestamp': {'$gte': thirty_days_ago}}},
+            {'$group': {
+                '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp'}},
+                'dailySales': {'$sum': '$value'}, 'count': {'$sum': 1}
+            }},
+            {'$sort': {'_id': 1}},
+            {'$limit': 30}
+        ])
+    ]
+
+
+def index_name(keys):
+    return '_'.join(f"{field}_{direction}" for field, direction in keys)
+
+
+def find_values(node, key):
+    """Collect every value stored under `key` anywhere in a nested explain document"""
+    found = []
+    if isinstance(node, dict):
+        for k, v in node.items():
+            if k == key:
+                found.append(v)
+            found.extend(find_values(v, key))
+    elif isinstance(node, list):
+        for item in node:
+            found.extend(find_values(item, key))
+    return found
+
+
+def summarize_explain(explain):
+    """Pull docs/keys examined and the winning plan's indexes out of an explain result"""
+    execution_stats = find_values(explain, 'executionStats')
+    docs_examined = sum(s.get('totalDocsExamined', 0) for s in execution_stats if isinstance(s, dict))
+    keys_examined = sum(s.get('totalKeysExamined', 0) for s in execution_stats if isinstance(s, dict))
+
+    indexes = set()
+    for plan in find_values(explain, 'winningPlan'):
+        indexes.update(find_values(plan, 'indexName'))
+        if 'COLLSCAN' in find_values(plan, 'stage'):
+            indexes.add('COLLSCAN')
+        if 'COUNT_SCAN' in find_values(plan, 'stage'):
+            indexes.add('COUNT_SCAN')
+
+    return {
+        'docs_examined': docs_examined,
+        'keys_examined': keys_examined,
+        'index_used': ','.join(sorted(indexes)) or 'n/a'
+    }
+
+
+class IndexBenchmark:
+    """Load a synthetic dataset into a local mongod and benchmark candidate index sets"""
+
+    def __init__(self, database='linq_benchmark', collection='sales_data_bench'):
+        self.client = db_connection.acquire()
+        self.db = db_connection.get_database(database)
+        self.collection = self.db[collection]
+        self.write_collection = self.db[f"{collection}_writes"]
+        self.ingestion = DataIngestion()
+        self.transformer = DataTransformer(verbose=False)
+        self.write_documents = []
+
+    def generate(self, start, end, seed):
+        transformed_data, _ = self.transformer.transform_pipeline(self.ingestion.generate_chunk(start, end, seed))
+        return transformed_data
+
+    def load_dataset(self, num_records, chunk_size=10000, seed=0):
+        """(Re)load the read-benchmark collection with num_records transformed documents"""
+        print(f"Loading {num_records:,} synthetic records into {self.db.name}.{self.collection.name}...")
+        self.collection.drop()
+        for start in range(0, num_records, chunk_size):
+            self.collection.insert_many(self.generate(start, min(start + chunk_size, num_records), seed), ordered=False)
+        print(f" Loaded {self.collection.estimated_document_count():,} documents")
+
+    def apply_index_set(self, collection, index_keys):
+        """Replace all secondary indexes with index_keys; returns build time in seconds"""
+        collection.drop_indexes()
+        start = time.perf_counter()
+        for keys in index_keys:
+            collection.create_index(keys, name=index_name(keys))
+        return time.perf_counter() - start
+
+    def run_query(self, kind, spec):
+        if kind == 'count':
+            return self.collection.count_documents(spec['filter'])
+        if kind == 'find':
+            cursor = self.collection.find(spec['filter'])
+            if 'sort' in spec:
+                cursor = cursor.sort(spec['sort'])
+            if 'limit' in spec:
+                cursor = cursor.limit(spec['limit'])
+            return sum(1 for _ in cursor)
+        return list(self.collection.aggregate(spec))
+
+    def explain_query(self, kind, spec):
+        if kind == 'find':
+            command = {'find': self.collection.name, 'filter': spec['filter']}
+            if 'sort' in spec:
+                command['sort'] = dict(spec['sort'])
+            if 'limit' in spec:
+                command['limit'] = spec['limit']
+        elif kind == 'count':
+            # count_documents runs as this aggregation, so explain the same thing
+            pipeline = [{'$match': spec['filter']}, {'$group': {'_id': 1, 'n': {'$sum': 1}}}]
+            command = {'aggregate': self.collection.name, 'pipeline': pipeline, 'cursor': {}}
+        else:
+            command = {'aggregate': self.collection.name, 'pipeline': spec, 'cursor': {}}
+        return self.db.command('explain', command, verbosity='executionStats')
+
+    def benchmark_reads(self, index_keys, repeats=5):
+        """Explain and time every project query under one index set"""
+        results = []
+        for name, kind, spec in build_queries(utc_now()):
+            summary = summarize_explain(self.explain_query(kind, spec))
+
+            latencies = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                self.run_query(kind, spec)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            summary.update({'query': name, 'median_ms': statistics.median(latencies), 'max_ms': max(latencies)})
+            results.append(summary)
+        return results
+
+    def benchmark_writes(self, index_keys, num_records, batch_size=1000, seed=1):
+        """Insert num_records into a scratch collection carrying index_keys; returns docs/sec"""
+        if len(self.write_documents) != num_records:
+            self.write_documents = self.generate(0, num_records, seed)
+        documents = self.write_documents
+        self.write_collection.drop()
+        for keys in index_keys:
+            self.write_collection.create_index(keys, name=index_name(keys))
+
+        start = time.perf_counter()
+        for i in range(0, len(documents), batch_size):
+            # insert_many adds _id to the dicts; strip it so each run inserts fresh documents
+            batch = [{k: v for k, v in doc.items() if k != '_id'} for doc in documents[i:i + batch_size]]
+            self.write_collection.insert_many(batch, ordered=False)
+        elapsed = time.perf_counter() - start
+        self.write_collection.drop()
+        return len(documents) / elapsed if elapsed > 0 else 0
+
+    def run(self, num_records, set_names, repeats=5, write_sample=50000):
+        self.load_dataset(num_records)
+        report = {'records': num_records, 'sets': {}, 'index_write_cost': {}}
+
+        print(f"\n Write throughput ({write_sample:,} docs per run)")
+        baseline = self.benchmark_writes([], write_sample)
+        print(f"   {'(no secondary indexes)':<40} {baseline:>10,.0f} docs/sec")
+        report['index_write_cost']['(none)'] = {'docs_per_sec': baseline, 'cost_pct': 0.0}
+
+        unique_indexes = {index_name(keys): keys for name in set_names for keys in INDEX_SETS[name]}
+        for name, keys in unique_indexes.items():
+            rate = self.benchmark_writes([keys], write_sample)
+            cost = (1 - rate / baseline) * 100 if baseline else 0
+            report['index_write_cost'][name] = {'docs_per_sec': rate, 'cost_pct': cost}
+            print(f"   {name:<40} {rate:>10,.0f} docs/sec ({cost:+.1f}% cost)")
+
+        for set_name in set_names:
+            index_keys = INDEX_SETS[set_name]
+            build_seconds = self.apply_index_set(self.collection, index_keys)
+            write_rate = self.benchmark_writes(index_keys, write_sample)
+            reads = self.benchmark_reads(index_keys, repeats)
+            report['sets'][set_name] = {
+                'indexes': [index_name(keys) for keys in index_keys],
+                'build_seconds': build_seconds,
+                'write_docs_per_sec': write_rate,
+                'queries': reads
+            }
+
+            print(f"\n Index set '{set_name}': {len(index_keys)} indexes | "
+                  f"build {build_seconds:.2f}s | writes {write_rate:,.0f} docs/sec")
+            print(f"   {'query':<30} {'docs examined':>14} {'keys examined':>14} {'median ms':>10}  index used")
+            for row in reads:
+                print(f"   {row['query']:<30} {row['docs_examined']:>14,} {row['keys_examined']:>14,} "
+                      f"{row['median_ms']:>10.2f}  {row['index_used']}")
+
+        return report
+
+    def close(self):
+        db_connection.release()
+
+
+def main():
+    """python index_benchmark.py [num_records] [--sets=none,generator,mongoose,proposed]
+    [--repeats=5] [--write-sample=50000] [--json=results.json]"""
+    args, options = parse_args()
+
+    num_records = int(args[0]) if args else 200000
+    set_names = options.get('sets', ','.join(INDEX_SETS)).split(',')
+    unknown = [name for name in set_names if name not in INDEX_SETS]
+    if unknown:
+        print(f"Unknown index sets: {', '.join(unknown)} (choose from {', '.join(INDEX_SETS)})")
+        sys.exit(1)
+
+    benchmark = IndexBenchmark()
+    try:
+        db_connection.verify_connection()
+        report = benchmark.run(
+            num_records, set_names,
+            repeats=int(options.get('repeats', 5)),
+            write_sample=int(options.get('write-sample', 50000))
+        )
+        if options.get('json'):
+            with open(options['json'], 'w') as f:
+                json.dump(report, f, indent=2, default=str)
+            print(f"\n Results written to {options['json']}")
+
+    except KeyboardInterrupt:
+        print("\n Benchmark interrupted by user")
+    except Exception as e:
+        print(f" Benchmark failed: {e}")
+        sys.exit(1)
+    finally:
+        benchmark.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import json
+import sys
+import threading
+import time
+import db_connection
+from realtime_data_generator import HighThroughputDataGenerator
+from cli_options import parse_args
+
+DEFAULT_LEVELS = [10, 50, 100, 250, 500, 1000]
+
+PERCENTILES = (0.50, 0.95, 0.99)
+
+
+def percentiles(samples_ms):
+    """{'p50': .., 'p95': .., 'p99': .., 'max': ..} of a list of milliseconds (None when empty)"""
+    if not samples_ms:
+        return {f"p{int(p * 100)}": None for p in PERCENTILES} | {'max': None}
+    ordered = sorted(samples_ms)
+    result = {f"p{int(p * 100)}": ordered[min(len(ordered) - 1, int(p * len(ordered)))] for p in PERCENTILES}
+    result['max'] = ordered[-1]
+    return result
+
+
+class ChangeStreamTail:
+    """Background change-stream consumer recording when each probe's insert becomes visible"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.seen = {}
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.stop_event = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        pipeline = [
+            {'$match': {'operationType': 'insert'}},
+            {'$project': {'fullDocument.probe_seq': 1}}
+        ]
+        try:
+            with self.collection.watch(pipeline, max_await_time_ms=100) as stream:
+                self.ready.set()
+                while not self.stop_event.is_set():
+                    change = stream.try_next()
+                    if change is None:
+                        continue
+                    received_ns = time.perf_counter_ns()
+                    with self.lock:
+                        self.seen[change['fullDocument']['probe_seq']] = received_ns
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait(timeout=30)
+        if self.error:
+            raise self.error
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=5)
+
+    def wait_for(self, sequence_numbers, timeout=10):
+        """Wait until every probe in sequence_numbers has been seen; returns how many were not"""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            with self.lock:
+                missing = sum(1 for seq in sequence_numbers if seq not in self.seen)
+            if missing == 0:
+                return 0
+            time.sleep(0.05)
+        return missing
+
+
+class LatencyHarness:
+    """Write-to-visibility latency of generated transactions on a local replica set
+
+    Each record is stamped with a perf_counter_ns creation time and a sequence number when
+    generated, then goes through the generator's transform and insert_many. The insert
+    acknowledgement and the change-stream event (tailed in this process, so the clocks
+    match) give generate->ack and generate->visible latencies for every record, measured
+    at a series of target TPS levels.
+    """
+
+    def __init__(self, database='linq_benchmark', collection='latency_probe'):
+        # The shared client, configured like every other component (MONGODB_URL, LINQ_DB_CONFIG)
+        self.client = db_connection.acquire()
+        self.collection = db_connection.get_database(database)[collection]
+        self.generator = HighThroughputDataGenerator()
+        self.generator.transformer.verbose = False
+        self.sequence = 0
+
+    def check_replica_set(self):
+        hello = self.client.admin.command('hello')
+        if 'setName' not in hello:
+            raise RuntimeError(
+                "Change streams need a replica set; start mongod with --replSet rs0 and run rs.initiate()"
+            )
+
+    def run_level(self, target_tps, duration):
+        """Generate at target_tps for duration seconds; returns the level's latency summary"""
+        batch_size = max(1, target_tps // 10)
+        batch_interval = batch_size / target_tps
+        created, acked = {}, {}
+
+        start = time.perf_counter()
+        end = start + duration
+        next_batch = start
+        while time.perf_counter() < end:
+            transactions = self.generator.generate_transaction_batch(batch_size)
+            for transaction in transactions:
+                self.sequence += 1
+                transaction['probe_seq'] = self.sequence
+                transaction['probe_ns'] = time.perf_counter_ns()
+                created[self.sequence] = transaction['probe_ns']
+
+            documents, _ = self.generator.transformer.transform_pipeline(transactions)
+            if documents:
+                self.collection.insert_many(documents, ordered=False)
+                ack_ns = time.perf_counter_ns()
+                for document in documents:
+                    acked[document['probe_seq']] = ack_ns
+
+            next_batch += batch_interval
+            sleep_time = next_batch - time.perf_counter()
+            if sleep_time > 0:
+                time.sleep(sleep_time)
+
+        elapsed = time.perf_counter() - start
+        missing = self.tail.wait_for(acked)
+        with self.tail.lock:
+            visible = {seq: self.tail.seen[seq] for seq in acked if seq in self.tail.seen}
+
+        return {
+            'target_tps': target_tps,
+            'achieved_tps': len(acked) / elapsed,
+            'records': len(acked),
+            'dropped_by_cleaning': len(created) - len(acked),
+            'missing_events': missing,
+            'ack_ms': percentiles([(acked[seq] - created[seq]) / 1e6 for seq in acked]),
+            'visible_ms': percentiles([(visible[seq] - created[seq]) / 1e6 for seq in visible])
+        }
+
+    def run(self, levels=DEFAULT_LEVELS, duration=10):
+        self.check_replica_set()
+        self.collection.drop()
+        self.tail = ChangeStreamTail(self.collection)
+        self.tail.start()
+
+        results = []
+        try:
+            for target_tps in levels:
+                print(f"Measuring {target_tps} TPS for {duration}s...")
+                results.append(self.run_level(target_tps, duration))
+        finally:
+            self.tail.stop()
+
+        self.print_report(results)
+        return results
+
+    def print_report(self, results):
+        print(f"\n {'target':>7} {'achieved':>9} | {'ack p50':>8} {'p95':>8} {'p99':>8} | "
+              f"{'visible p50':>11} {'p95':>8} {'p99':>8} | {'missing':>7}")
+        for row in results:
+            ack, visible = row['ack_ms'], row['visible_ms']
+            cells = [f"{value:8.1f}" if value is not None else f"{'-':>8}"
+                     for value in (ack['p50'], ack['p95'], ack['p99'], visible['p50'], visible['p95'], visible['p99'])]
+            print(f" {row['target_tps']:>7} {row['achieved_tps']:>9.1f} | {cells[0]} {cells[1]} {cells[2]} | "
+                  f"{cells[3]:>11} {cells[4]} {cells[5]} | {row['missing_events']:>7}")
+        print(" (latencies in ms from record creation)")
+
+    def plot(self, results, filename):
+        """Latency-vs-throughput curve as an HTML chart"""
+        import plotly.graph_objects as go
+
+        fig = go.Figure()
+        x = [row['achieved_tps'] for row in results]
+        for series, dash in (('ack_ms', 'dot'), ('visible_ms', 'solid')):
+            for percentile in ('p50', 'p99'):
+                fig.add_trace(go.Scatter(
+                    x=x, y=[row[series][percentile] for row in results], mode='lines+markers',
+                    name=f"{series.replace('_ms', '')} {percentile}", line=dict(dash=dash)
+                ))
+        fig.update_layout(
+            title='Write-to-Visibility Latency vs Throughput',
+            xaxis_title='Achieved TPS',
+            yaxis_title='Latency from creation (ms)'
+        )
+        fig.write_html(filename)
+        print(f"\n Latency curve saved as {filename}")
+
+    def close(self):
+        db_connection.release()
+
+
+def main():
+    """python latency_harness.py [duration_seconds] [--levels=10,50,100,250,500,1000] [--json=results.json] [--plot=latency.html]"""
+    args, options = parse_args()
+
+    duration = float(args[0]) if args else 10
+    levels = [int(level) for level in options['levels'].split(',')] if options.get('levels') else DEFAULT_LEVELS
+
+    harness = LatencyHarness()
+    try:
+        results = harness.run(levels, duration)
+        if options.get('json'):
+            with open(options['json'], 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"\n Results written to {options['json']}")
+        if options.get('plot'):
+            harness.plot(results, options['plot'])
+
+    except KeyboardInterrupt:
+        print("\n Harness interrupted by user")
+    except Exception as e:
+        print(f" Harness failed: {e}")
+        sys.exit(1)
+    finally:
+        harness.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+CAPTURES = ('cpu', 'alloc')
+
+
+def frame_label(frame):
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+
+class ProfilingHooks:
+    """Capture a CPU profile or allocation snapshot from a running process on demand
+
+    SIGUSR1 starts a sampling profiler and SIGUSR2 starts tracemalloc; each runs for a
+    fixed window and writes its result under output_dir. Captures can also be requested
+    by writing 'cpu' or 'alloc' (optionally followed by a window in seconds) to a control
+    file, which poll() checks at most once per poll_interval. Nothing runs between
+    captures, so an idle hook costs one stat call per poll_interval.
+    """
+
+    def __init__(self, output_dir='profiles', window=30, sample_interval=0.005, top_n=25,
+                 control_file=None, poll_interval=1.0):
+        self.output_dir = output_dir
+        self.window = window
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.control_file = control_file
+        self.poll_interval = poll_interval
+        self.next_poll = 0
+        self.active = set()
+        self.lock = threading.Lock()
+
+    def install(self):
+        """Register the signal handlers (where the platform has SIGUSR1/SIGUSR2)"""
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.trigger('cpu'))
+            signal.signal(signal.SIGUSR2, lambda signum, frame: self.trigger('alloc'))
+        return self
+
+    def poll(self):
+        """Check the control file; cheap enough to call from every loop iteration"""
+        if not self.control_file:
+            return
+        now = time.monotonic()
+        if now < self.next_poll:
+            return
+        self.next_poll = now + self.poll_interval
+
+        try:
+            with open(self.control_file) as f:
+                command = f.read().split()
+            os.remove(self.control_file)
+        except FileNotFoundError:
+            return
+        if command and command[0] in CAPTURES:
+            self.trigger(command[0], float(command[1]) if len(command) > 1 else None)
+
+    def trigger(self, capture, window=None):
+        """Start a capture in a background thread; ignored while the same capture is running"""
+        with self.lock:
+            if capture in self.active:
+                return False
+            self.active.add(capture)
+        target = self.sample_cpu if capture == 'cpu' else self.snapshot_allocations
+        threading.Thread(
+            target=self._run, args=(capture, target, window or self.window), name=f"profiling-{capture}", daemon=True
+        ).start()
+        return True
+
+    def _run(self, capture, target, window):
+        try:
+            path = target(window)
+            print(f" Profiling: {capture} capture written to {path}")
+        except Exception as e:
+            print(f" Profiling: {capture} capture failed: {e}")
+        finally:
+            with self.lock:
+                self.active.discard(capture)
+
+    def output_path(self, kind, extension):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        return os.path.join(self.output_dir, f"{kind}-{os.getpid()}-{stamp}.{extension}")
+
+    def sample_cpu(self, window):
+        """Sample every thread's stack for window seconds; writes collapsed stacks for flamegraph tools"""
+        print(f" Profiling: sampling stacks for {window:g}s")
+        names = {}
+        stacks = Counter()
+        deadline = time.monotonic() + window
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                name = names.get(thread_id, f"thread-{thread_id}")
+                if name.startswith('profiling-'):
+                    continue  # this sampler and any concurrent allocation capture
+                labels = []
+                while frame is not None:
+                    labels.append(frame_label(frame))
+                    frame = frame.f_back
+                labels.append(name)
+                stacks[';'.join(reversed(labels))] += 1
+            time.sleep(self.sample_interval)
+
+        path = self.output_path('cpu', 'collapsed')
+        with open(path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def snapshot_allocations(self, window):
+        """Trace allocations for window seconds; writes the top allocation sites still alive"""
+        print(f" Profiling: tracing allocations for {window:g}s")
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(25)
+        start_snapshot = tracemalloc.take_snapshot()
+        time.sleep(window)
+        end_snapshot = tracemalloc.take_snapshot()
+        if started_here:
+            tracemalloc.stop()
+
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        end_snapshot = end_snapshot.filter_traces(filters)
+        growth = end_snapshot.compare_to(start_snapshot.filter_traces(filters), 'lineno')
+        total = sum(stat.size for stat in end_snapshot.statistics('filename'))
+
+        path = self.output_path('alloc', 'txt')
+        with open(path, 'w') as f:
+            f.write(f"Traced memory after {window:g}s: {total / 1024:.1f} KiB\n\n")
+            f.write(f"Top {self.top_n} allocation sites by growth during the window:\n")
+            for stat in growth[:self.top_n]:
+                f.write(f"{stat}\n")
+            f.write(f"\nTracebacks of the top {min(5, self.top_n)} sites:\n")
+            for stat in end_snapshot.statistics('traceback')[:min(5, self.top_n)]:
+                f.write(f"\n{stat.count} blocks, {stat.size / 1024:.1f} KiB\n")
+                for line in stat.traceback.format():
+                    f.write(f"{line}\n")
+        return path
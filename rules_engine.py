@@ -0,0 +1,342 @@
+import ast
+import functools
+import itertools
+import json
+import operator
+import os
+import threading
+import numpy as np
+import pandas as pd
+from sales_schema import REQUIRED_FIELDS
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'business_rules.json')
+# Same rules with every monetary output as int64 cents (DataTransformer(cents=True))
+CENTS_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'business_rules_cents.json')
+RULES_PATH_ENV = 'LINQ_BUSINESS_RULES'
+
+# Column stamped on every output row with the version of the rule set that produced it
+VERSION_FIELD = 'rules_version'
+
+# Wildcard key in lookup tables, matching any value (including ones not listed)
+WILDCARD = '*'
+
+DTYPES = {'bool': bool, 'int': np.int64, 'float': np.float64, 'str': object}
+
+FUNCTIONS = {
+    'floor': np.floor,
+    'ceil': np.ceil,
+    'round': np.round,
+    'abs': np.abs,
+    'min': np.minimum,
+    'max': np.maximum,
+    'where': np.where
+}
+
+def divide_half_up(values, scale):
+    # Halves round away from zero, as in commercial rounding
+    return np.sign(values) * ((np.abs(values) + scale // 2) // scale)
+
+
+def divide_half_even(values, scale):
+    quotient, remainder = np.divmod(values, scale)
+    round_up = (2 * remainder > scale) | ((2 * remainder == scale) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+# Integer division by a money rule's scale, rounded as named
+ROUNDING = {
+    'half_up': divide_half_up,
+    'half_even': divide_half_even,
+    'down': lambda values, scale: np.sign(values) * (np.abs(values) // scale),
+    'floor': lambda values, scale: values // scale
+}
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow
+}
+
+COMPARISONS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda left, right: isin(left, right),
+    ast.NotIn: lambda left, right: ~isin(left, right)
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def isin(values, candidates):
+    if isinstance(values, pd.Series):
+        return values.isin(candidates).to_numpy()
+    return np.isin(values, candidates)
+
+
+class RuleError(ValueError):
+    """A rule definition that cannot be compiled or evaluated"""
+
+
+class BatchColumns:
+    """Column values for one batch, each taken from the DataFrame at most once
+
+    Numeric and boolean columns become numpy arrays. String and categorical columns stay
+    Series, because their hashed operations (isin, categorical codes) are much faster
+    than on an object array.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.arrays = {}
+
+    def get(self, name):
+        if name not in self.arrays:
+            if name not in self.df:
+                raise KeyError(name)
+            column = self.df[name]
+            is_numeric = pd.api.types.is_numeric_dtype(column.dtype) or pd.api.types.is_bool_dtype(column.dtype)
+            self.arrays[name] = column.to_numpy() if is_numeric else column
+        return self.arrays[name]
+
+
+def compile_expression(text, constants, rule_name):
+    """Compile an expression string into a function of BatchColumns returning an array
+
+    Expressions are parsed once with Python's ast module and turned into a tree of
+    closures over numpy operations, so evaluating a batch does no parsing and no
+    per-row Python work. Names resolve to constants first, then to columns.
+    """
+    try:
+        tree = ast.parse(text, mode='eval')
+    except SyntaxError as e:
+        raise RuleError(f"Rule '{rule_name}': invalid expression {text!r}: {e.msg}")
+
+    columns = set()
+
+    def build(node):
+        if isinstance(node, ast.Constant):
+            value = node.value
+            return lambda batch: value
+        if isinstance(node, ast.Name):
+            if node.id in constants:
+                value = constants[node.id]
+                return lambda batch: value
+            name = node.id
+            columns.add(name)
+            return lambda batch: batch.get(name)
+        if isinstance(node, (ast.List, ast.Tuple)):
+            values = [ast.literal_eval(element) for element in node.elts]
+            return lambda batch: values
+        if isinstance(node, ast.BoolOp):
+            parts = [build(value) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return lambda batch: functools.reduce(combine, [part(batch) for part in parts])
+        if isinstance(node, ast.UnaryOp):
+            operand = build(node.operand)
+            if isinstance(node.op, ast.Not):
+                return lambda batch: np.logical_not(operand(batch))
+            if isinstance(node.op, ast.USub):
+                return lambda batch: -operand(batch)
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            left, right, op = build(node.left), build(node.right), BINARY_OPERATORS[type(node.op)]
+            return lambda batch: op(left(batch), right(batch))
+        if isinstance(node, ast.Compare) and all(type(op) in COMPARISONS for op in node.ops):
+            operands = [build(node.left)] + [build(comparator) for comparator in node.comparators]
+            ops = [COMPARISONS[type(op)] for op in node.ops]
+
+            def compare(batch):
+                values = [operand(batch) for operand in operands]
+                return functools.reduce(np.logical_and, [op(values[i], values[i + 1]) for i, op in enumerate(ops)])
+            return compare
+        if isinstance(node, ast.IfExp):
+            test, body, orelse = build(node.test), build(node.body), build(node.orelse)
+            return lambda batch: np.where(test(batch), body(batch), orelse(batch))
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS:
+            function, args = FUNCTIONS[node.func.id], [build(arg) for arg in node.args]
+            return lambda batch: function(*[arg(batch) for arg in args])
+
+        raise RuleError(f"Rule '{rule_name}': unsupported syntax {ast.dump(node)[:60]} in {text!r}")
+
+    return build(tree.body), columns
+
+
+class LookupTable:
+    """Values keyed by one or more categorical columns, stored as a dense numpy array
+
+    Each key column gets its listed values plus one trailing slot for anything else,
+    so a batch is evaluated by turning each key column into integer codes and indexing
+    the array once. '*' entries fill that trailing slot and act as per-level defaults.
+    """
+
+    def __init__(self, keys, table, default):
+        self.keys = [keys] if isinstance(keys, str) else list(keys)
+        self.levels = [[] for _ in self.keys]
+        self.collect_levels(table, 0)
+
+        shape = tuple(len(level) + 1 for level in self.levels)
+        self.values = np.empty(shape, dtype=object)
+        for index in itertools.product(*[range(size) for size in shape]):
+            labels = [self.levels[axis][i] if i < len(self.levels[axis]) else WILDCARD for axis, i in enumerate(index)]
+            self.values[index] = self.resolve(table, labels, default)
+
+        # Narrow the dtype (float/int/bool) when every value allows it
+        try:
+            self.values = np.array(self.values.tolist())
+        except (TypeError, ValueError):
+            pass
+        self.columns = set(self.keys)
+
+    def collect_levels(self, table, depth):
+        if depth == len(self.keys):
+            return
+        if not isinstance(table, dict):
+            raise RuleError(f"Lookup table nests fewer levels than its keys {self.keys}")
+        for label, value in table.items():
+            if label != WILDCARD and label not in self.levels[depth]:
+                self.levels[depth].append(label)
+            self.collect_levels(value, depth + 1)
+
+    def resolve(self, table, labels, default):
+        for label in labels:
+            if not isinstance(table, dict):
+                return default
+            table = table.get(label, table.get(WILDCARD, default))
+        return table
+
+    def __call__(self, batch):
+        codes = tuple(
+            pd.Index(level).get_indexer(batch.get(key))
+            for key, level in zip(self.keys, self.levels)
+        )
+        # Unknown values get code -1, which indexes the trailing wildcard slot
+        return self.values[codes]
+
+
+class MoneyExpression:
+    """Integer money arithmetic: an expression evaluated in int64, divided by scale with rounding
+
+    Float results (such as value * 100) are first rounded to the nearest integer, so
+    dollars become exact cents; everything after that is integer arithmetic, e.g. cents
+    times a rate in basis points divided by 10000, rounded half up.
+    """
+
+    def __init__(self, definition, constants, rule_name):
+        self.expression, self.columns = compile_expression(definition['expr'], constants, rule_name)
+        scale = definition.get('scale', 1)
+        self.scale = int(constants.get(scale, scale) if isinstance(scale, str) else scale)
+        rounding = definition.get('rounding', 'half_up')
+        if rounding not in ROUNDING:
+            raise RuleError(f"Rule '{rule_name}': unknown rounding '{rounding}'; choose one of {', '.join(ROUNDING)}")
+        self.divide = ROUNDING[rounding]
+
+    def __call__(self, batch):
+        values = np.asarray(self.expression(batch))
+        if not np.issubdtype(values.dtype, np.integer):
+            values = np.rint(values.astype(np.float64))
+        values = values.astype(np.int64)
+        return self.divide(values, self.scale) if self.scale != 1 else values
+
+
+class Rule:
+    """One compiled output column: a formula, a lookup or integer money arithmetic,
+    optionally limited by a condition"""
+
+    def __init__(self, definition, constants):
+        self.name = definition.get('name', definition.get('output'))
+        self.output = definition['output']
+        if self.output in REQUIRED_FIELDS or self.output == VERSION_FIELD:
+            raise RuleError(f"Rule '{self.name}' may not overwrite '{self.output}'")
+
+        rule_type = definition.get('type', 'formula')
+        if rule_type == 'formula':
+            self.evaluate, self.columns = compile_expression(definition['expr'], constants, self.name)
+        elif rule_type == 'lookup':
+            self.evaluate = LookupTable(definition['key'], definition['table'], definition.get('default'))
+            self.columns = self.evaluate.columns
+        elif rule_type == 'money':
+            self.evaluate = MoneyExpression(definition, constants, self.name)
+            self.columns = self.evaluate.columns
+        else:
+            raise RuleError(f"Rule '{self.name}': unknown type '{rule_type}'")
+
+        self.dtype = DTYPES[definition['dtype']] if 'dtype' in definition else None
+        if rule_type == 'money':
+            self.dtype = np.int64
+        self.when = None
+        if 'when' in definition:
+            self.when, when_columns = compile_expression(definition['when'], constants, self.name)
+            self.columns = self.columns | when_columns
+
+    def apply(self, batch, length):
+        values = np.broadcast_to(np.asarray(self.evaluate(batch)), (length,))
+        if self.when is not None:
+            # Rows outside the condition keep the value an earlier rule gave this output
+            mask = np.broadcast_to(np.asarray(self.when(batch)), (length,))
+            try:
+                previous = batch.get(self.output)
+            except KeyError:
+                raise RuleError(f"Rule '{self.name}' has a 'when' condition but no earlier rule sets '{self.output}'")
+            values = np.where(mask, values, np.asarray(previous))
+        if self.dtype is not None:
+            values = values.astype(self.dtype)
+        return values
+
+
+class RuleEngine:
+    """A versioned rule set compiled once and applied to whole batches
+
+    Rules run in file order and may use columns produced by earlier rules. All outputs
+    for a batch are computed as numpy arrays and assigned to the DataFrame together.
+    """
+
+    def __init__(self, config):
+        self.version = str(config.get('version', 'unversioned'))
+        self.constants = dict(config.get('constants', {}))
+        self.rules = [Rule(definition, self.constants) for definition in config.get('rules', [])]
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    @property
+    def outputs(self):
+        return list(dict.fromkeys(rule.output for rule in self.rules))
+
+    def apply(self, df):
+        batch = BatchColumns(df)
+        outputs = {}
+        for rule in self.rules:
+            try:
+                values = rule.apply(batch, len(df))
+            except KeyError as e:
+                raise RuleError(f"Rule '{rule.name}' references unknown column {e}")
+            batch.arrays[rule.output] = values
+            outputs[rule.output] = values
+        outputs[VERSION_FIELD] = self.version
+        return df.assign(**outputs)
+
+
+def load_rules(path=None):
+    """Rule engine for path (default: LINQ_BUSINESS_RULES or business_rules.json)
+
+    Engines are cached per file and recompiled only when its modification time
+    changes, so callers can ask for the rules every batch and pick up edits live.
+    """
+    path = path or os.environ.get(RULES_PATH_ENV) or DEFAULT_RULES_PATH
+    mtime = os.path.getmtime(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, RuleEngine.from_file(path))
+            _cache[path] = cached
+        return cached[1]
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+
+CATEGORIES = [
+    'Electronics', 'Clothing', 'Home & Garden', 'Sports',
+    'Books', 'Health & Beauty', 'Automotive', 'Toys'
+]
+
+REGIONS = ['North', 'South', 'East', 'West', 'Central']
+
+REQUIRED_FIELDS = ['category', 'value', 'timestamp', 'region', 'customer_id']
+
+# Label sets of the derived fields; with CATEGORIES and REGIONS these are the fixed
+# category dictionaries shared by the transformer and the dashboard
+SEASONS = ['Winter', 'Spring', 'Summer', 'Fall']
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+TIMEZONES = ['America/New_York', 'America/Chicago', 'America/Denver', 'America/Los_Angeles']
+CUSTOMER_SEGMENTS = ['Regular', 'Frequent', 'VIP', 'Champion']
+PRICE_TIERS = ['Budget', 'Mid-range', 'Premium', 'Luxury']
+
+CATEGORICAL_DTYPES = {
+    'category': pd.CategoricalDtype(CATEGORIES),
+    'region': pd.CategoricalDtype(REGIONS),
+    'season': pd.CategoricalDtype(SEASONS),
+    'day_of_week': pd.CategoricalDtype(DAYS_OF_WEEK, ordered=True),
+    'timezone': pd.CategoricalDtype(TIMEZONES),
+    'customer_segment': pd.CategoricalDtype(CUSTOMER_SEGMENTS),
+    'price_tier': pd.CategoricalDtype(PRICE_TIERS, ordered=True)
+}
+
+# Categorical columns whose dictionary is built from the data itself (about 900k possible ids)
+DYNAMIC_CATEGORICALS = ['customer_id']
+
+CUSTOMER_ID_PATTERN = r'CUST_\d{6}'
+
+
+def apply_categorical_schema(df, extend=False):
+    """Convert the schema's string columns present in df to categoricals, in place
+
+    Fixed dictionaries keep the same integer code for a label in every batch. Labels
+    outside a dictionary become NaN, unless extend is set, in which case they are
+    appended after the known labels (for stored documents that may predate the schema).
+    """
+    for column, dtype in CATEGORICAL_DTYPES.items():
+        if column not in df or df[column].dtype == dtype:
+            continue
+        if extend:
+            extra = pd.Index(df[column].dropna().unique()).difference(dtype.categories)
+            if len(extra):
+                dtype = pd.CategoricalDtype(dtype.categories.append(extra.astype(object)), ordered=dtype.ordered)
+        # Codes from the dictionary directly; unknown labels get -1, which from_codes reads as NaN
+        codes = dtype.categories.get_indexer(df[column])
+        df[column] = pd.Categorical.from_codes(codes, dtype=dtype)
+    for column in DYNAMIC_CATEGORICALS:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def to_records(df):
+    """Plain records for the writers: categorical columns back to their string labels
+
+    The one place pipeline frames leave the categorical layout, so every sink and
+    backfill update stores the same plain values whatever the frame's dtypes.
+    """
+    categorical = [column for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)]
+    return df.astype({column: object for column in categorical}).to_dict('records')
+
+
+class BatchValidator:
+    """Vectorized validation of a whole batch of sales records in one pass"""
+
+    # Reason codes, in the order they are checked; a row reports its first failure
+    REASONS = [
+        'missing_field',
+        'invalid_value',
+        'invalid_category',
+        'invalid_region',
+        'invalid_customer_id',
+        'invalid_timestamp',
+        'future_timestamp'
+    ]
+
+    def __init__(self, categories=CATEGORIES, regions=REGIONS, min_value=0, max_value=None,
+                 future_tolerance=timedelta(0)):
+        self.categories = pd.Index(categories)
+        self.regions = pd.Index(regions)
+        self.min_value = min_value
+        self.max_value = max_value
+        self.future_tolerance = future_tolerance
+
+    def validate(self, df):
+        """Return (mask, reasons): True for valid rows, and a reason code per rejected row"""
+        n = len(df)
+        missing_columns = [field for field in REQUIRED_FIELDS if field not in df.columns]
+        if missing_columns:
+            return np.zeros(n, dtype=bool), pd.Series('missing_field', index=df.index)
+
+        missing = df[REQUIRED_FIELDS].isna().to_numpy().any(axis=1)
+
+        values = pd.to_numeric(df['value'], errors='coerce').to_numpy(dtype=float)
+        bad_value = ~(values > self.min_value)
+        if self.max_value is not None:
+            bad_value |= ~(values <= self.max_value)
+
+        # Membership via hashed lookups into the label index: unknown labels get position -1
+        bad_category = self.categories.get_indexer(df['category']) < 0
+        bad_region = self.regions.get_indexer(df['region']) < 0
+
+        customer_ids = df['customer_id']
+        if pd.api.types.is_object_dtype(customer_ids) or pd.api.types.is_string_dtype(customer_ids):
+            bad_customer = ~customer_ids.str.fullmatch(CUSTOMER_ID_PATTERN, na=False).to_numpy(dtype=bool)
+        else:
+            bad_customer = np.ones(n, dtype=bool)
+
+        # Naive timestamps are UTC (writers stamp db_connection.utc_now()), so parse everything as UTC
+        timestamps = pd.to_datetime(df['timestamp'], errors='coerce', utc=True)
+        bad_timestamp = timestamps.isna().to_numpy()
+        future = (timestamps > pd.Timestamp.now(tz='UTC') + self.future_tolerance).to_numpy(dtype=bool)
+
+        checks = [missing, bad_value, bad_category, bad_region, bad_customer, bad_timestamp, future]
+        mask = ~np.logical_or.reduce(checks)
+
+        rejected = ~mask
+        reasons = pd.Series(
+            np.select([check[rejected] for check in checks], self.REASONS, default='invalid'),
+            index=df.index[rejected]
+        )
+        return mask, reasons
+
+    def validate_records(self, records):
+        """Validate a list of dicts; returns (valid_records, reasons) keyed by position"""
+        frame = pd.DataFrame({field: [record.get(field) for record in records] for field in REQUIRED_FIELDS})
+        mask, reasons = self.validate(frame)
+        valid_records = [record for record, is_valid in zip(records, mask) if is_valid]
+        return valid_records, reasons
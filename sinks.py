@@ -0,0 +1,197 @@
+import json
+import queue
+import threading
+from datetime import date, datetime
+
+SINK_TYPES = ('mongo', 'null', 'jsonl', 'parquet', 'queue')
+
+
+def json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()  # numpy scalars
+    return str(value)
+
+
+class MongoSink:
+    """insert_many into a collection (the default)"""
+
+    needs_database = True
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.description = f"MongoDB collection '{collection.name}'"
+
+    def write(self, documents):
+        result = self.collection.insert_many(documents, ordered=False)
+        return len(result.inserted_ids)
+
+    def close(self):
+        pass
+
+
+class NullSink:
+    """Discard every batch; measures generation and transformation alone"""
+
+    needs_database = False
+    description = 'null sink (documents discarded)'
+
+    def __init__(self):
+        self.written = 0
+        self.lock = threading.Lock()
+
+    def write(self, documents):
+        with self.lock:
+            self.written += len(documents)
+        return len(documents)
+
+    def close(self):
+        pass
+
+
+class JsonlFileSink:
+    """Append each document to a JSON Lines file (datetimes as ISO strings)"""
+
+    needs_database = False
+
+    def __init__(self, path):
+        self.path = path
+        self.description = f"JSON Lines file {path}"
+        self.handle = open(path, 'a', encoding='utf-8')
+        self.lock = threading.Lock()
+
+    def write(self, documents):
+        lines = ''.join(json.dumps(document, default=json_default) + '\n' for document in documents)
+        with self.lock:
+            self.handle.write(lines)
+        return len(documents)
+
+    def close(self):
+        with self.lock:
+            self.handle.close()
+
+
+class ParquetFileSink:
+    """Write batches to a Parquet file, one row group per row_group_size documents
+
+    The schema is taken from the first row group; later batches are cast to it, so
+    every batch must carry the same fields. Requires pyarrow.
+    """
+
+    needs_database = False
+
+    def __init__(self, path, row_group_size=50000):
+        import pyarrow  # noqa: F401  (fail at startup rather than on the first write)
+
+        self.path = path
+        self.row_group_size = row_group_size
+        self.description = f"Parquet file {path}"
+        self.buffer = []
+        self.writer = None
+        self.lock = threading.Lock()
+
+    def write(self, documents):
+        with self.lock:
+            self.buffer.extend(documents)
+            if len(self.buffer) >= self.row_group_size:
+                self.write_row_group()
+        return len(documents)
+
+    def write_row_group(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = [{key: value for key, value in document.items() if key != '_id'} for document in self.buffer]
+        self.buffer = []
+        if self.writer is None:
+            table = pa.Table.from_pylist(rows)
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = pa.Table.from_pylist(rows, schema=self.writer.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        with self.lock:
+            if self.buffer:
+                self.write_row_group()
+            if self.writer is not None:
+                self.writer.close()
+
+
+class QueueSink:
+    """Hand batches to a bounded in-process queue, drained by a consumer thread
+
+    With no consumer the batches are discarded after the handoff, which isolates the
+    cost of the queue itself; a full queue blocks the writer, as a slow database would.
+    If the consumer raises, the thread keeps draining (discarding) so writers never block
+    on a dead consumer, and the error is re-raised from the next write() or close().
+    """
+
+    needs_database = False
+
+    def __init__(self, maxsize=100, consumer=None):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.consumer = consumer
+        self.description = f"in-process queue (max {maxsize} batches)"
+        self.consumed = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._drain, daemon=True)
+        self.thread.start()
+
+    def _drain(self):
+        while True:
+            documents = self.queue.get()
+            if documents is None:
+                return
+            if self.consumer and self.error is None:
+                try:
+                    self.consumer(documents)
+                except Exception as e:
+                    self.error = e
+                    continue
+            self.consumed += len(documents)
+
+    def raise_consumer_error(self):
+        if self.error is not None:
+            raise RuntimeError(f"Queue consumer failed: {self.error}") from self.error
+
+    def write(self, documents):
+        self.raise_consumer_error()
+        self.queue.put(documents)
+        return len(documents)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.raise_consumer_error()
+
+
+def parse_sink(spec):
+    """(type, argument) of a sink spec such as 'mongo', 'null', 'jsonl:out.jsonl' or 'queue:50'"""
+    sink_type, _, argument = (spec or 'mongo').partition(':')
+    if sink_type not in SINK_TYPES:
+        raise ValueError(f"Unknown sink '{sink_type}'; choose one of {', '.join(SINK_TYPES)}")
+    if sink_type in ('jsonl', 'parquet') and not argument:
+        raise ValueError(f"The {sink_type} sink needs a path, e.g. --sink={sink_type}:output.{sink_type}")
+    return sink_type, argument
+
+
+def needs_database(spec):
+    return parse_sink(spec)[0] == 'mongo'
+
+
+def create_sink(spec, collection=None):
+    """Sink for a --sink= spec; collection is required for the mongo sink"""
+    sink_type, argument = parse_sink(spec)
+    if sink_type == 'mongo':
+        if collection is None:
+            raise ValueError("The mongo sink needs a connected collection")
+        return MongoSink(collection)
+    if sink_type == 'null':
+        return NullSink()
+    if sink_type == 'jsonl':
+        return JsonlFileSink(argument)
+    if sink_type == 'parquet':
+        return ParquetFileSink(argument)
+    return QueueSink(int(argument) if argument else 100)
@@ -0,0 +1,99 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from startup_probe import PROBE_ENV
+from cli_options import parse_args
+
+# Milestones timed from process spawn, with the command that reaches each one
+MILESTONES = {
+    'generator_first_insert': ('first_insert', [sys.executable, 'realtime_data_generator.py', '50']),
+    'dashboard_first_query': ('first_query', [sys.executable, 'visualization.py'])
+}
+
+MODULES = ['realtime_data_generator', 'visualization', 'data_ingest', 'transformations']
+
+# CLIs that must not load pandas/plotly at import time; checked by --max-import-ms
+LIGHT_MODULES = ['realtime_data_generator', 'visualization']
+
+
+def time_import(module):
+    """Seconds for a fresh interpreter to import module (interpreter startup excluded)"""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def time_milestone(event, command, timeout=60):
+    """Seconds from spawning command until it reports the startup milestone"""
+    env = dict(os.environ, **{PROBE_ENV: event})
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env)
+    try:
+        for line in process.stdout:
+            if line.startswith(f"STARTUP_PROBE {event}"):
+                return time.perf_counter() - start
+            if time.perf_counter() - start > timeout:
+                break
+        return None
+    finally:
+        process.kill()
+        process.wait()
+
+
+def run(repeats=5, imports_only=False):
+    results = {'imports_ms': {}, 'milestones_ms': {}}
+
+    print(f" Module import time (median of {repeats} fresh interpreters)")
+    for module in MODULES:
+        samples = [time_import(module) * 1000 for _ in range(repeats)]
+        results['imports_ms'][module] = statistics.median(samples)
+        print(f"   {module:<28} {results['imports_ms'][module]:>8.1f} ms")
+
+    if imports_only:
+        return results
+
+    print(f"\n Time to first database operation (median of {repeats} runs)")
+    for name, (event, command) in MILESTONES.items():
+        samples = [time_milestone(event, command) for _ in range(repeats)]
+        samples = [sample * 1000 for sample in samples if sample is not None]
+        if not samples:
+            print(f"   {name:<28} not reached (check the database connection)")
+            results['milestones_ms'][name] = None
+            continue
+        results['milestones_ms'][name] = statistics.median(samples)
+        print(f"   {name:<28} {results['milestones_ms'][name]:>8.1f} ms")
+
+    return results
+
+
+def main():
+    """python startup_benchmark.py [repeats] [--imports-only] [--max-import-ms=N] [--json=results.json]"""
+    args, options = parse_args()
+    repeats = int(args[0]) if args else 5
+
+    # Run from the project directory so the CLIs and their modules resolve
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    results = run(repeats, imports_only='imports-only' in options)
+
+    if options.get('json'):
+        with open(options['json'], 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n Results written to {options['json']}")
+
+    # Fail CI when a CLI module starts importing heavy libraries at load time again
+    if options.get('max-import-ms'):
+        limit = float(options['max-import-ms'])
+        slow = {m: results['imports_ms'][m] for m in LIGHT_MODULES if results['imports_ms'][m] > limit}
+        if slow:
+            for module, ms in slow.items():
+                print(f" Import regression: {module} took {ms:.1f} ms (limit {limit:.0f} ms)")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import os
+
+# startup_benchmark.py sets this to the milestone it is timing ('first_insert' or 'first_query')
+PROBE_ENV = 'LINQ_STARTUP_PROBE'
+_probe_event = os.environ.get(PROBE_ENV)
+
+
+def mark(event):
+    """Report a startup milestone to startup_benchmark.py; a no-op unless it is being timed"""
+    if _probe_event == event:
+        print(f"STARTUP_PROBE {event}", flush=True)
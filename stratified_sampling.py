@@ -0,0 +1,327 @@
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+from sales_schema import CATEGORIES
+from cli_options import parse_args
+
+# Uniform [0, 1) value stamped on every document by DataTransformer.enrich_data
+SAMPLE_KEY = 'sample_key'
+
+# Index for each strata's sample_key draws, created by 'python stratified_sampling.py indexes'.
+# (category, sample_key) is equality-prefixed, so a category stratum's draw reads only its
+# sample's slice of the index. A day stratum's timestamp range still walks all of that day's
+# index keys, but sample_key is checked in the index, so only the sampled documents are fetched
+SAMPLE_INDEXES = {
+    'day': [('timestamp', -1), (SAMPLE_KEY, 1)],
+    'category': [('category', 1), (SAMPLE_KEY, 1)]
+}
+
+STRATA = ('day', 'category')
+
+# Counters may trail the collection by a flush interval; beyond this relative gap they are
+# treated as stale (archived or TTL-expired documents) and strata are counted instead
+COUNTS_TOLERANCE = 0.01
+
+Z_95 = 1.96
+
+
+def counts_collection(collection):
+    """Per-stratum counters kept beside a sales collection (sales_data_strata, sales_data_ts_strata)"""
+    return collection.database[collection.name + '_strata']
+
+
+def day_start(timestamp):
+    return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+
+class StrataCounter:
+    """Write-path listener keeping a document count per day and per category
+
+    Counts are buffered and applied every flush_interval seconds with one unordered bulk of
+    $inc upserts, so the sampler reads every stratum size with a single query instead of
+    counting each stratum's documents.
+    """
+
+    def __init__(self, collection, flush_interval=5):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.pending = Counter()
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+
+    def record_batch(self, records):
+        with self.lock:
+            for record in records:
+                self.pending['day', day_start(record['timestamp'])] += 1
+                self.pending['category', record['category']] += 1
+            due = time.monotonic() - self.last_flush >= self.flush_interval
+
+        if due:
+            self.flush()
+        return len(records)
+
+    def flush(self):
+        """Apply the buffered counts; returns the number of counters updated"""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.last_flush = time.monotonic()
+        if not pending:
+            return 0
+        try:
+            self.collection.bulk_write([
+                UpdateOne({'_id': counter_id(strata, label)},
+                          {'$inc': {'count': count}, '$setOnInsert': {'strata': strata, 'label': label}},
+                          upsert=True)
+                for (strata, label), count in pending.items()
+            ], ordered=False)
+        except Exception:
+            # Keep the counts for the next flush
+            with self.lock:
+                self.pending.update(pending)
+            raise
+        return len(pending)
+
+
+def counter_id(strata, label):
+    return f"day:{label:%Y-%m-%d}" if strata == 'day' else f"category:{label}"
+
+
+def rebuild_counts(collection, counts):
+    """Recount every stratum from the sales collection and replace the stored counters
+
+    Needed once for data written before the counters existed, and after documents are
+    removed outside the writers (data_export.py --delete, TTL expiry). Returns the counters written.
+    """
+    groups = {
+        'day': {'$dateTrunc': {'date': '$timestamp', 'unit': 'day'}},
+        'category': '$category'
+    }
+    documents = [
+        {'_id': counter_id(strata, row['_id']), 'strata': strata, 'label': row['_id'], 'count': row['count']}
+        for strata, key in groups.items()
+        for row in collection.aggregate([{'$group': {'_id': key, 'count': {'$sum': 1}}}], allowDiskUse=True)
+        if row['_id'] is not None
+    ]
+    counts.delete_many({})
+    if documents:
+        counts.insert_many(documents, ordered=False)
+    return len(documents)
+
+
+class StratifiedSampler:
+    """Draw a fixed-size stratified sample of sales_data, per calendar day or per category
+
+    The sample size is split across strata in proportion to their size (with a floor so
+    small strata still get a variance estimate). Stratum sizes come from the counters kept
+    by StrataCounter when they are given and agree with the collection's size, else from a
+    count per stratum. Each stratum is drawn either with the indexed sample_key field or,
+    for strata holding documents written before it existed, with $sample.
+    Every sampled row carries its stratum and the stratum's population size, which is all
+    stratified_totals needs to scale up totals and compute confidence intervals.
+    """
+
+    def __init__(self, collection, strata='day', sample_size=20000, min_per_stratum=30, method='auto',
+                 counts=None, timeseries=False):
+        if strata not in STRATA:
+            raise ValueError(f"strata must be one of {STRATA}, got '{strata}'")
+        self.collection = collection
+        self.strata = strata
+        self.sample_size = sample_size
+        self.min_per_stratum = min_per_stratum
+        self.method = method
+        # Optional counters collection (see counts_collection)
+        self.counts = counts
+        # Time-series collections are views, which have no metadata count
+        self.timeseries = timeseries
+
+    def resolve_method(self):
+        """'sample_key' when the newest document carries the field and its index exists, else '$sample'
+
+        With 'auto', strata that still hold documents without the field fall back to
+        $sample individually (see stratum_method). Without the index a sample_key draw
+        would scan its strata, and building it is left to the indexes command, so readers
+        never add indexes that every write then maintains.
+        """
+        if self.method != 'auto':
+            return self.method
+        import db_connection
+
+        newest = self.collection.find_one({}, {SAMPLE_KEY: 1}, sort=[('timestamp', -1)])
+        if not newest or SAMPLE_KEY not in newest:
+            return '$sample'
+        if tuple(SAMPLE_INDEXES[self.strata]) not in db_connection.existing_indexes(self.collection):
+            print(f"  No {self.strata} sample_key index; drawing with $sample "
+                  f"(run 'python stratified_sampling.py indexes' to create it)")
+            return '$sample'
+        return 'sample_key'
+
+    def stratum_method(self, query, method):
+        """$sample for a stratum holding any document written before sample_key existed"""
+        if method == 'sample_key' and self.method == 'auto' and \
+                self.collection.find_one(dict(query, **{SAMPLE_KEY: None}), {'_id': 1}):
+            return '$sample'
+        return method
+
+    def stratum_filter(self, label):
+        if self.strata == 'category':
+            return {'category': label}
+        return {'timestamp': {'$gte': label, '$lt': label + timedelta(days=1)}}
+
+    def counted_sizes(self):
+        """{stratum: size} from the counters, or None when they are missing or stale"""
+        if self.counts is None:
+            return None
+        sizes = {document['label']: document['count']
+                 for document in self.counts.find({'strata': self.strata, 'count': {'$gt': 0}})}
+        if not sizes:
+            return None
+        total = self.collection.count_documents({}) if self.timeseries else self.collection.estimated_document_count()
+        if abs(sum(sizes.values()) - total) > COUNTS_TOLERANCE * total:
+            print(f"  Stratum counters cover {sum(sizes.values()):,} of {total:,} documents; counting strata instead "
+                  f"(run 'python stratified_sampling.py rebuild' to resync them)")
+            return None
+        if self.strata == 'day':
+            return {label.date(): size for label, size in sizes.items()}
+        return sizes
+
+    def strata_filters(self):
+        """(stratum label, filter) pairs covering the collection"""
+        if self.strata == 'category':
+            return [(category, self.stratum_filter(category)) for category in CATEGORIES]
+
+        first = self.collection.find_one({}, {'timestamp': 1}, sort=[('timestamp', 1)])
+        last = self.collection.find_one({}, {'timestamp': 1}, sort=[('timestamp', -1)])
+        if not first or not last:
+            return []
+        day = day_start(first['timestamp'])
+        filters = []
+        while day <= last['timestamp']:
+            filters.append((day.date(), self.stratum_filter(day)))
+            day += timedelta(days=1)
+        return filters
+
+    def stratum_sizes(self):
+        """[(stratum, filter, size)] for every non-empty stratum"""
+        sizes = self.counted_sizes()
+        if sizes is not None:
+            return [
+                (stratum, self.stratum_filter(day_start(stratum) if self.strata == 'day' else stratum), size)
+                for stratum, size in sorted(sizes.items())
+            ]
+        counted = [(stratum, query, self.collection.count_documents(query)) for stratum, query in self.strata_filters()]
+        return [(stratum, query, size) for stratum, query, size in counted if size > 0]
+
+    def allocate(self, sizes):
+        """Proportional allocation with a per-stratum floor, capped at each stratum's size"""
+        total = sum(sizes.values())
+        return {
+            stratum: min(size, max(self.min_per_stratum, round(self.sample_size * size / total)))
+            for stratum, size in sizes.items()
+        }
+
+    def draw_stratum(self, query, target, size, method, projection):
+        if target >= size:
+            return list(self.collection.find(query, projection))
+        if self.stratum_method(query, method) == 'sample_key':
+            rows = list(self.collection.find(dict(query, **{SAMPLE_KEY: {'$lt': target / size}}), projection))
+            if rows:
+                return rows
+        return list(self.collection.aggregate([{'$match': query}, {'$sample': {'size': target}}, {'$project': projection}]))
+
+    def draw(self, fields=None):
+        """Sampled rows as a DataFrame with stratum, stratum_size and weight columns"""
+        method = self.resolve_method()
+        projection = {field: 1 for field in (fields or ['timestamp', 'value', 'category', 'region', 'customer_id', 'hour'])}
+        projection['_id'] = 0
+
+        strata = self.stratum_sizes()
+        if not strata:
+            return pd.DataFrame()
+        targets = self.allocate({stratum: size for stratum, _, size in strata})
+
+        frames = []
+        for stratum, query, size in strata:
+            rows = self.draw_stratum(query, targets[stratum], size, method, projection)
+            frame = pd.DataFrame(rows)
+            frame['stratum'] = stratum
+            frame['stratum_size'] = size
+            # Weight by the realized count: a sample_key draw returns ~target rows, not exactly
+            frame['weight'] = size / len(frame)
+            frames.append(frame)
+
+        return pd.concat(frames, ignore_index=True)
+
+
+def stratified_totals(sample, by=None, value='value', z=Z_95):
+    """Estimated total sales and transaction count per `by` group, with CI half-widths
+
+    For each group the estimate is sum_h N_h * ybar_h over strata h, with variance
+    sum_h N_h^2 (1 - n_h/N_h) s_h^2 / n_h, where y is the value (or 1, for counts) inside
+    the group and 0 outside it. With by=None the whole sample is one group.
+    """
+    df = pd.DataFrame({
+        'stratum': sample['stratum'],
+        'group': sample[by] if by else 'all',
+        'sales': sample[value].astype(float),
+        'sales_sq': sample[value].astype(float) ** 2,
+        'count': 1.0
+    })
+    strata = sample.groupby('stratum', observed=True)['stratum_size'].agg(['size', 'first'])
+    n_h = strata['size'].to_numpy(dtype=float)[:, None]
+    N_h = strata['first'].to_numpy(dtype=float)[:, None]
+
+    sums = df.groupby(['stratum', 'group'], observed=True).agg(sales=('sales', 'sum'), sales_sq=('sales_sq', 'sum'), count=('count', 'sum'))
+    # Strata where a group never appears contribute y = 0 for every sampled row
+    sums = sums.unstack('group', fill_value=0.0).reindex(strata.index, fill_value=0.0)
+
+    finite_population = N_h ** 2 * (1 - n_h / N_h) / n_h
+    denominator = np.maximum(n_h - 1, 1)
+    result = {}
+    for name, total, square in (('total_sales', 'sales', 'sales_sq'), ('transaction_count', 'count', 'count')):
+        s = sums[total].to_numpy()
+        q = sums[square].to_numpy()
+        variance_h = np.where(n_h > 1, (q - s ** 2 / n_h) / denominator, 0.0)
+        result[name] = (N_h * s / n_h).sum(axis=0)
+        result[f'{name}_ci'] = z * np.sqrt((finite_population * np.maximum(variance_h, 0)).sum(axis=0))
+
+    totals = pd.DataFrame(result, index=sums['sales'].columns)
+    totals.index.name = by
+    return totals
+
+
+def main():
+    """python stratified_sampling.py rebuild|indexes [--timeseries]"""
+    import db_connection
+    from timeseries_storage import get_sales_collection
+
+    args, options = parse_args()
+    command = args[0] if args else 'rebuild'
+    if command not in ('rebuild', 'indexes'):
+        print(f"Unknown command '{command}'; choose rebuild or indexes")
+        sys.exit(1)
+
+    db_connection.acquire()
+    try:
+        collection = get_sales_collection(db_connection.get_database(), 'timeseries' in options, create=False)
+        start = time.perf_counter()
+        if command == 'indexes':
+            created = db_connection.ensure_indexes(collection, list(SAMPLE_INDEXES.values()))
+            print(f" Created {created} sample_key indexes on {collection.name} in {time.perf_counter() - start:.1f}s")
+        else:
+            written = rebuild_counts(collection, counts_collection(collection))
+            print(f" Rebuilt {written:,} stratum counters for {collection.name} in {time.perf_counter() - start:.1f}s")
+    except KeyboardInterrupt:
+        print(f"\n {command.capitalize()} interrupted by user")
+    except Exception as e:
+        print(f" {command.capitalize()} failed: {e}")
+        sys.exit(1)
+    finally:
+        db_connection.release()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import json
+from decimal import Decimal, ROUND_HALF_EVEN, ROUND_HALF_UP
+
+import numpy as np
+import pytest
+
+import rules_engine
+from data_ingest import DataIngestion
+from rules_engine import ROUNDING
+from transformations import DataTransformer
+
+
+def decimal_divide(numerator, scale, rounding):
+    return int((Decimal(int(numerator)) / Decimal(scale)).quantize(Decimal(1), rounding=rounding))
+
+
+@pytest.mark.parametrize('name, rounding', [('half_up', ROUND_HALF_UP), ('half_even', ROUND_HALF_EVEN)])
+def test_rounding_matches_decimal(name, rounding):
+    rng = np.random.default_rng(0)
+    cents = rng.integers(-10_000_000, 10_000_000, 20000)
+    rates = rng.integers(0, 2000, 20000)
+    numerators = cents * rates
+
+    result = ROUNDING[name](numerators, 10000)
+
+    assert result.tolist() == [decimal_divide(n, 10000, rounding) for n in numerators]
+
+
+@pytest.mark.parametrize('name, rounding', [('half_up', ROUND_HALF_UP), ('half_even', ROUND_HALF_EVEN)])
+def test_exact_halves(name, rounding):
+    halves = np.array([5000, 15000, 25000, -5000, -15000, -25000, 0])
+    assert ROUNDING[name](halves, 10000).tolist() == [decimal_divide(n, 10000, rounding) for n in halves]
+
+
+def test_cents_pipeline_matches_decimal():
+    with open(rules_engine.CENTS_RULES_PATH) as f:
+        constants = json.load(f)['constants']
+
+    records = DataIngestion().generate_chunk(0, 3000)
+    # Values whose tax lands exactly on half a cent (100 * 850 / 10000 = 8.5) and other 2-dp edge cases
+    for record, value in zip(records, [1.00, 3.00, 0.29, 0.57, 1.15, 4.35, 10.01, 4999.99]):
+        record['value'] = value
+    transformed, metrics = DataTransformer(verbose=False, cents=True).transform_pipeline(records)
+
+    for document in transformed:
+        cents = Decimal(str(document['value'])) * 100
+        assert document['value_cents'] == int(cents)
+        tax = cents * constants['tax_rate_bp'] / 10000
+        assert document['tax_cents'] == int(tax.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+        commission = cents * document['commission_rate_bp'] / 10000
+        assert document['commission_cents'] == int(commission.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+    assert metrics['total_revenue_cents'] == sum(document['value_cents'] for document in transformed)
+    assert metrics['total_revenue'] == metrics['total_revenue_cents'] / 100
@@ -0,0 +1,10 @@
+from cli_options import parse_args
+
+
+def test_positional_args_options_and_flags():
+    args, options = parse_args(['bulk', '1000', '--sink=jsonl:out=1.jsonl', '--timeseries', '4'])
+
+    assert args == ['bulk', '1000', '4']
+    # Only the first '=' separates the name, so values may contain more
+    assert options == {'sink': 'jsonl:out=1.jsonl', 'timeseries': ''}
+    assert 'timeseries' in options and 'cents' not in options
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from customer_activity import (
+    ActivityRecorder, CustomerActivity, compress, decompress, period_bitmaps, to_bitmap, union
+)
+
+START = datetime(2026, 3, 2)  # a Monday
+
+
+def members(bitmap):
+    data = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+    return set(np.flatnonzero(np.unpackbits(data, bitorder='little')).tolist())
+
+
+class FakeActivityCollection:
+    """The slice of a pymongo collection the recorder and queries use, keyed by day"""
+
+    def __init__(self):
+        self.documents = {}
+
+    def find_one(self, query, projection=None):
+        document = self.documents.get(query['_id'])
+        return dict(document) if document else None
+
+    def insert_one(self, document):
+        if document['_id'] in self.documents:
+            raise DuplicateKeyError('duplicate day')
+        self.documents[document['_id']] = dict(document)
+
+    def replace_one(self, query, replacement):
+        document = self.documents.get(query['_id'])
+        matched = document is not None and document['version'] == query['version']
+        if matched:
+            self.documents[query['_id']] = dict(replacement, _id=query['_id'])
+        return type('Result', (), {'matched_count': int(matched)})()
+
+    def find(self, query, projection=None):
+        bounds = query['_id']
+        return [dict(document) for day, document in sorted(self.documents.items())
+                if bounds['$gte'] <= day < bounds['$lt']]
+
+
+@pytest.fixture
+def activity():
+    """28 days of random activity, recorded through ActivityRecorder, plus the same data as sets"""
+    rng = np.random.default_rng(0)
+    daily = {START + timedelta(days=d): set(rng.integers(0, 2000, 150).tolist()) for d in range(28)}
+    collection = FakeActivityCollection()
+    recorder = ActivityRecorder(collection, flush_interval=3600)
+    for day, customers in daily.items():
+        customers = sorted(customers)
+        # Two batches per day, so days are merged into an existing bitmap as well as created
+        for half in (customers[::2], customers[1::2]):
+            recorder.record_batch([{'customer_id': f"CUST_{c:06d}", 'timestamp': day + timedelta(hours=13)}
+                                   for c in half])
+            recorder.flush()
+    return CustomerActivity(collection), daily
+
+
+def test_bitmap_helpers():
+    positions = np.array([0, 3, 64, 999_999])
+    bitmap = to_bitmap(positions)
+    assert members(bitmap) == {0, 3, 64, 999_999}
+    assert decompress(compress(bitmap)) == bitmap
+    assert to_bitmap(np.array([], dtype=int)) == 0
+    assert union([to_bitmap(np.array([1])), to_bitmap(np.array([2])), 0]) == 0b110
+
+
+def test_recorder_skips_ids_outside_the_bitmap_space():
+    collection = FakeActivityCollection()
+    recorder = ActivityRecorder(collection)
+    recorder.record_batch([
+        {'customer_id': 'CUST_000007', 'timestamp': START},
+        {'customer_id': 'GUEST_1', 'timestamp': START},
+        {'customer_id': 'CUST_1234567', 'timestamp': START}
+    ])
+    recorder.flush()
+    assert members(decompress(collection.documents[START]['bitmap'])) == {7}
+    assert collection.documents[START]['active'] == 1
+
+
+def test_active_users_match_sets(activity):
+    queries, daily = activity
+    day = START + timedelta(days=27)
+    expected = {
+        'dau': len(daily[day]),
+        'wau': len(set().union(*(daily[day - timedelta(days=d)] for d in range(7)))),
+        'mau': len(set().union(*daily.values()))
+    }
+    assert queries.active_users(day) == expected
+
+
+def test_retention_matches_sets(activity):
+    queries, daily = activity
+    weeks = [set().union(*(daily[START + timedelta(days=7 * w + d)] for d in range(7))) for w in range(4)]
+
+    rows = queries.retention(START, periods=4)
+
+    assert [row['active'] for row in rows] == [len(weeks[0] & week) for week in weeks]
+    assert rows[0]['rate'] == 1.0
+    assert rows[3]['rate'] == pytest.approx(len(weeks[0] & weeks[3]) / len(weeks[0]))
+
+
+def test_cohort_table_matches_sets(activity):
+    queries, daily = activity
+    weeks = [set().union(*(daily[START + timedelta(days=7 * w + d)] for d in range(7))) for w in range(4)]
+
+    rows = queries.cohort_table(START, periods=4)
+
+    seen = set()
+    for i, row in enumerate(rows):
+        cohort = weeks[i] - seen
+        seen |= weeks[i]
+        assert row['size'] == len(cohort)
+        assert row['retention'] == pytest.approx([len(cohort & later) / len(cohort) for later in weeks[i:]])
+
+
+def test_repeat_rate_matches_sets(activity):
+    queries, daily = activity
+    end = START + timedelta(days=14)
+    counts = {}
+    for day, customers in daily.items():
+        if day < end:
+            for customer in customers:
+                counts[customer] = counts.get(customer, 0) + 1
+
+    result = queries.repeat_rate(START, end)
+
+    assert result['customers'] == len(counts)
+    assert result['repeat_customers'] == sum(1 for count in counts.values() if count >= 2)
+
+
+def test_period_bitmaps_split_days_into_windows():
+    daily = {START + timedelta(days=d): 1 << d for d in range(10)}
+    weeks = period_bitmaps(daily, START, 2, timedelta(days=7))
+    assert members(weeks[0]) == set(range(7))
+    assert members(weeks[1]) == {7, 8, 9}
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from data_export import ParquetExporter
+from data_ingest import DataIngestion
+from transformations import DataTransformer
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+DAY = datetime(2024, 3, 1)
+
+
+class FakeSalesCollection:
+    """Stored documents in insert order, answering the export's day query"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query, batch_size=None):
+        bounds = query['timestamp']
+        return [document for document in self.documents
+                if bounds['$gte'] <= document['timestamp'] < bounds['$lt'] and document['_id'] < query['_id']['$lt']]
+
+
+def day_documents(day, records, cents, seed):
+    """Pipeline documents moved onto one day"""
+    documents, _ = DataTransformer(verbose=False, cents=cents).transform_pipeline(
+        DataIngestion().generate_chunk(0, records, seed=seed)
+    )
+    for document in documents:
+        document['timestamp'] = day + (document['timestamp'] - day) % timedelta(days=1)
+        document['_id'] = ObjectId()
+    return documents
+
+
+def read_rows(paths):
+    rows = []
+    for path in paths:
+        rows.extend(pq.read_table(path).to_pylist())
+    return rows
+
+
+def export(tmp_path, documents, day):
+    exporter = ParquetExporter(FakeSalesCollection(documents), output_dir=str(tmp_path / 'export'), batch_size=200)
+    exported = exporter.export_day(day, ObjectId())
+    return exported, exporter.part_paths(day)
+
+
+def test_fields_added_after_the_first_batch_are_kept(tmp_path):
+    legacy = day_documents(DAY, 500, cents=False, seed=1)
+    current = day_documents(DAY, 500, cents=True, seed=2)
+    for document in legacy:
+        del document['sample_key']
+
+    exported, paths = export(tmp_path, legacy + current, DAY)
+
+    assert exported == len(legacy) + len(current)
+    assert [path.rsplit('/', 1)[1] for path in paths] == ['part-0-1.parquet', 'part-0.parquet']
+    rows = {row['_id']: row for row in read_rows(paths)}
+    assert len(rows) == exported
+    for document in current:
+        row = rows[str(document['_id'])]
+        assert row['sample_key'] == document['sample_key']
+        assert row['value_cents'] == document['value_cents']
+
+
+def test_batches_missing_fields_share_the_file(tmp_path):
+    current = day_documents(DAY, 500, cents=False, seed=3)
+    legacy = day_documents(DAY, 500, cents=False, seed=4)
+    for document in legacy:
+        del document['sample_key']
+
+    exported, paths = export(tmp_path, current + legacy, DAY)
+
+    assert exported == len(current) + len(legacy)
+    assert len(paths) == 1
+    rows = {row['_id']: row for row in read_rows(paths)}
+    assert all(rows[str(document['_id'])]['sample_key'] is None for document in legacy)
+    assert all(rows[str(document['_id'])]['sample_key'] == document['sample_key'] for document in current)
@@ -0,0 +1,92 @@
+import json
+from collections import Counter
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+from bson import ObjectId
+
+from data_export import ParquetExporter
+from data_ingest import DataIngestion
+from file_import import FileImporter
+from sales_schema import REQUIRED_FIELDS
+from sinks import JsonlFileSink
+from transformations import DataTransformer
+
+pytest.importorskip('pyarrow')
+
+
+class FakeSalesCollection:
+    """Stored documents, answering the export's day query"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query, batch_size=None):
+        bounds = query['timestamp']
+        return [document for document in self.documents
+                if bounds['$gte'] <= document['timestamp'] < bounds['$lt'] and document['_id'] < query['_id']['$lt']]
+
+
+def pipeline_documents(records=3000, cents=False):
+    """Documents as the generator and ingestion write them"""
+    documents, _ = DataTransformer(verbose=False, cents=cents).transform_pipeline(
+        DataIngestion().generate_chunk(0, records)
+    )
+    for document in documents:
+        document['_id'] = ObjectId()
+    return documents
+
+
+def raw_fields(documents):
+    return Counter(
+        (d['category'], round(float(d['value']), 2), d['region'], d['customer_id'], pd.Timestamp(d['timestamp']).floor('s'))
+        for d in documents
+    )
+
+
+def import_file(path, tmp_path, cents=False):
+    output = tmp_path / 'imported.jsonl'
+    ingestion = DataIngestion(sink=f'jsonl:{output}', cents=cents)
+    assert ingestion.connect_database()
+    importer = FileImporter(ingestion, chunk_size=500)
+    written = importer.import_file(str(path))
+    ingestion.sink.close()
+    assert importer.errors == []
+    with open(output) as f:
+        return written, [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize('cents', [False, True])
+def test_reimport_of_a_parquet_export(tmp_path, cents):
+    documents = pipeline_documents(cents=cents)
+    day = min(d['timestamp'] for d in documents).replace(hour=0, minute=0, second=0, microsecond=0)
+    day_documents = [d for d in documents if day <= d['timestamp'] < day + timedelta(days=1)]
+
+    exporter = ParquetExporter(FakeSalesCollection(documents), output_dir=str(tmp_path / 'export'))
+    exported = exporter.export_day(day, ObjectId())
+    assert exported == len(day_documents) > 0
+
+    written, imported = import_file(exporter.part_paths(day)[0], tmp_path, cents)
+
+    assert written == exported
+    assert raw_fields(imported) == raw_fields(day_documents)
+    # Derived fields are recomputed once, not carried over from the file with suffixes
+    assert set(imported[0]) == set(documents[0]) - {'_id'}
+    assert not any(key.endswith(('_x', '_y')) for key in imported[0])
+
+
+def test_reimport_of_a_jsonl_sink_file(tmp_path):
+    documents = pipeline_documents()
+    for document in documents:
+        del document['_id']
+    sink = JsonlFileSink(str(tmp_path / 'sink.jsonl'))
+    sink.write(documents)
+    sink.close()
+
+    written, imported = import_file(tmp_path / 'sink.jsonl', tmp_path)
+
+    assert written == len(documents)
+    assert raw_fields(imported) == raw_fields(documents)
+    assert set(imported[0]) == set(documents[0])
+    assert set(REQUIRED_FIELDS) <= set(imported[0])
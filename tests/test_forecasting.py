@@ -0,0 +1,130 @@
+import math
+from datetime import timedelta
+
+import bson
+import numpy as np
+
+from forecasting import EPOCH, HoltWinters, SalesForecaster, period_number
+
+
+def noise(t):
+    """Deterministic uniform noise in [-5, 5), the same for period t in every call"""
+    return 10 * ((math.sin(t * 12.9898) * 43758.5453) % 1 - 0.5)
+
+
+def seasonal_series(periods, start=0, trend=0.5):
+    return [100 + trend * t + 20 * math.sin(2 * math.pi * (t % 24) / 24) + noise(t)
+            for t in range(start, start + periods)]
+
+
+def trained(periods=400, trend=0.5):
+    model = HoltWinters((24, 168))
+    values = seasonal_series(periods, trend=trend)
+    model.initialize(0, values)
+    for period, value in enumerate(values):
+        model.update(period, value)
+    return model
+
+
+def test_state_round_trip_through_bson():
+    model = trained()
+    # The state is stored as a MongoDB document, so it must survive BSON encoding
+    restored = HoltWinters.from_state(bson.decode(bson.encode(model.to_state())))
+
+    assert restored.to_state() == model.to_state()
+    assert restored.forecast(48) == model.forecast(48)
+
+
+def test_restored_model_keeps_learning_identically():
+    model = trained()
+    restored = HoltWinters.from_state(bson.decode(bson.encode(model.to_state())))
+
+    for period, value in enumerate(seasonal_series(100, start=400), start=400):
+        model.update(period, value)
+        restored.update(period, value)
+
+    assert restored.to_state() == model.to_state()
+    assert restored.next_period == 500
+
+
+def test_forecast_follows_the_daily_cycle():
+    model = trained(24 * 21, trend=0)
+    points = np.array([point for _, point, _, _ in model.forecast(24)])
+    signal = np.array([100 + 20 * math.sin(2 * math.pi * (t % 24) / 24) for t in range(24 * 21, 24 * 22)])
+    assert np.corrcoef(points, signal)[0, 1] > 0.9
+    assert np.abs(points - signal).max() < 12
+    # Intervals widen with the horizon
+    widths = [upper - lower for _, _, lower, upper in model.forecast(24)]
+    assert widths == sorted(widths)
+
+
+class FakeStateCollection:
+    def __init__(self):
+        self.documents = {}
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            # Store what the server would return: a BSON round trip of the replacement
+            self.documents[operation._filter['_id']] = bson.decode(bson.encode(operation._doc))
+
+    def find(self, query):
+        return [document for document in self.documents.values() if document['granularity'] == query['granularity']]
+
+
+class FakeSalesCollection:
+    """Hourly totals per category and region, grouped as period_totals' pipeline would"""
+
+    def __init__(self, hours):
+        self.rows = []
+        for t, value in enumerate(seasonal_series(hours)):
+            hour = EPOCH + timedelta(hours=t)
+            self.rows.append((hour, 'Books', 'North', value * 0.6))
+            self.rows.append((hour, 'Toys', 'South', value * 0.4))
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        match = pipeline[0]['$match']['timestamp']
+        return [
+            {'_id': {'period': hour, 'category': category, 'region': region}, 'total': total}
+            for hour, category, region, total in self.rows
+            if hour < match['$lt'] and hour >= match.get('$gte', hour)
+        ]
+
+
+def test_incremental_refresh_matches_a_single_refresh():
+    sales = FakeSalesCollection(24 * 14)
+    now = EPOCH + timedelta(hours=24 * 14)
+
+    once = SalesForecaster(FakeStateCollection(), 'hour')
+    once.refresh(sales, now)
+
+    state = FakeStateCollection()
+    first = SalesForecaster(state, 'hour')
+    first.refresh(sales, EPOCH + timedelta(hours=24 * 10))
+    # A later run starts from the persisted state only
+    second = SalesForecaster(state, 'hour').load()
+    assert second.refresh(sales, now) == 5 * 24 * 4
+
+    for series in ('all', 'category:Books', 'region:South'):
+        assert second.models[series].to_state() == once.models[series].to_state()
+        assert second.forecast(series, 24) == once.forecast(series, 24)
+    assert second.models['all'].next_period == period_number(now, timedelta(hours=1))
+
+
+def test_refresh_picks_up_rows_backdated_into_the_lookback_window():
+    sales = FakeSalesCollection(24 * 14)
+    now = EPOCH + timedelta(hours=24 * 14)
+    lookback = timedelta(days=3)
+
+    state = FakeStateCollection()
+    SalesForecaster(state, 'hour', lookback).refresh(sales, EPOCH + timedelta(hours=24 * 10))
+    # A load after that run writes a sale into a period the models have already seen
+    sales.rows.append((EPOCH + timedelta(hours=24 * 9 + 5), 'Books', 'North', 500.0))
+    second = SalesForecaster(state, 'hour', lookback).load()
+    second.refresh(sales, now)
+
+    once = SalesForecaster(FakeStateCollection(), 'hour', lookback)
+    once.refresh(sales, now)
+
+    for series in ('all', 'category:Books', 'region:North', 'region:South'):
+        assert second.models[series].to_state() == once.models[series].to_state()
+        assert second.settled[series].next_period == period_number(now - lookback, timedelta(hours=1))
@@ -0,0 +1,88 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from heavy_hitters import HeavyHitterTracker, SlidingTopK, SpaceSaving, top_entries
+
+
+def zipf_stream(size, seed=0):
+    rng = np.random.default_rng(seed)
+    keys = rng.zipf(1.3, size) % 5000
+    weights = np.round(rng.lognormal(3, 1, size), 2)
+    return list(zip(keys.tolist(), weights.tolist()))
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_space_saving_error_bounds(weighted):
+    capacity = 64
+    sketch = SpaceSaving(capacity)
+    truth = Counter()
+    for key, weight in zipf_stream(50000):
+        weight = weight if weighted else 1
+        sketch.update(key, weight)
+        truth[key] += weight
+    total = sum(truth.values())
+
+    assert len(sketch.counters) == capacity
+    for key, (count, error) in sketch.counters.items():
+        # Estimates never undercount, and overcount by at most the inherited error
+        assert count >= truth[key] - 1e-6
+        assert count - error <= truth[key] + 1e-6
+        assert error <= total / capacity + 1e-6
+
+    # Anything heavier than total / capacity is kept; untracked keys weigh at most the floor
+    for key, weight in truth.items():
+        if weight > total / capacity:
+            assert key in sketch.counters
+        if key not in sketch.counters:
+            assert weight <= sketch.floor + 1e-6
+
+
+def test_space_saving_is_exact_below_capacity():
+    sketch = SpaceSaving(10)
+    for key, weight in [('a', 3), ('b', 1), ('a', 2), ('c', 4)]:
+        sketch.update(key, weight)
+    assert sketch.counters == {'a': [5, 0], 'b': [1, 0], 'c': [4, 0]}
+    assert sketch.floor == 0
+
+
+def test_sliding_window_bounds_and_expiry():
+    window = SlidingTopK(window_seconds=60, buckets=6, capacity=32)
+    stream = zipf_stream(20000, seed=1)
+    in_window = Counter()
+    for i, (key, weight) in enumerate(stream):
+        now = i * 0.01  # 200 seconds of traffic
+        window.update(key, weight, now)
+        if now >= 140:  # the window at 199.99s is the six 10s buckets starting at 140s
+            in_window[key] += weight
+
+    top = window.top(10, now=199.99)
+    assert len(top) == 10
+    for key, estimate, error in top:
+        assert estimate >= in_window[key] - 1e-6
+        assert estimate - error <= in_window[key] + 1e-6
+
+    # After the whole window has passed without updates, nothing is reported
+    assert window.top(10, now=400) == []
+
+
+class FakeSummary:
+    def __init__(self):
+        self.document = None
+
+    def replace_one(self, query, document, upsert=False):
+        self.document = dict(document, _id=query['_id'])
+
+
+def test_flush_publishes_batches_since_the_last_interval():
+    summary = FakeSummary()
+    tracker = HeavyHitterTracker(summary, publish_interval=3600)
+    tracker.record_batch([{'customer_id': 'CUST_000001', 'category': 'Books', 'region': 'North', 'value': 10.0}])
+    # The first batch publishes; the next one is inside the interval
+    tracker.record_batch([{'customer_id': 'CUST_000002', 'category': 'Toys', 'region': 'South', 'value': 50.0}])
+    assert [entry['key'] for entry in top_entries(summary.document)] == ['CUST_000001']
+
+    tracker.flush()
+    assert [entry['key'] for entry in top_entries(summary.document)] == ['CUST_000002', 'CUST_000001']
+    assert top_entries(None) == []
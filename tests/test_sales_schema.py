@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+import pandas as pd
+
+from db_connection import utc_now
+from sales_schema import BatchValidator, REQUIRED_FIELDS
+
+
+def record(**overrides):
+    base = {
+        'category': 'Books',
+        'value': 25.5,
+        'timestamp': utc_now() - timedelta(days=1),
+        'region': 'North',
+        'customer_id': 'CUST_123456'
+    }
+    base.update(overrides)
+    return base
+
+
+def test_valid_records_pass():
+    valid, reasons = BatchValidator().validate_records([record(), record(category='Toys', region='Central')])
+    assert len(valid) == 2
+    assert reasons.empty
+
+
+def test_each_check_reports_its_reason_code():
+    cases = {
+        'missing_field': record(customer_id=None),
+        'invalid_value': record(value=-3),
+        'invalid_category': record(category='Groceries'),
+        'invalid_region': record(region='Atlantis'),
+        'invalid_customer_id': record(customer_id='CUST_12'),
+        'invalid_timestamp': record(timestamp='not a date'),
+        'future_timestamp': record(timestamp=utc_now() + timedelta(days=1))
+    }
+    records = list(cases.values()) + [record()]
+
+    valid, reasons = BatchValidator().validate_records(records)
+
+    assert valid == [records[-1]]
+    assert reasons.tolist() == list(cases)
+    assert reasons.index.tolist() == list(range(len(cases)))
+
+
+def test_first_failing_check_wins():
+    # Bad value, category and region at once: value is checked first
+    _, reasons = BatchValidator().validate_records([record(value=0, category='Groceries', region='Atlantis')])
+    assert reasons.tolist() == ['invalid_value']
+
+
+def test_non_numeric_and_out_of_range_values():
+    validator = BatchValidator(max_value=1000)
+    _, reasons = validator.validate_records([record(value='abc'), record(value=1000.01), record(value=1000)])
+    assert reasons.to_dict() == {0: 'invalid_value', 1: 'invalid_value'}
+
+
+def test_future_tolerance():
+    soon = utc_now() + timedelta(minutes=1)
+    assert BatchValidator().validate_records([record(timestamp=soon)])[1].tolist() == ['future_timestamp']
+    assert BatchValidator(future_tolerance=timedelta(minutes=5)).validate_records([record(timestamp=soon)])[1].empty
+
+
+def test_categorical_input_columns():
+    df = pd.DataFrame([record(), record(category='Groceries')]).astype({'category': 'category', 'region': 'category'})
+    _, reasons = BatchValidator().validate(df)
+    assert reasons.to_dict() == {1: 'invalid_category'}
+
+
+def test_missing_column_rejects_every_row():
+    df = pd.DataFrame([record(), record()]).drop(columns='region')
+    mask, reasons = BatchValidator().validate(df)
+    assert not mask.any()
+    assert reasons.tolist() == ['missing_field', 'missing_field']
+    assert 'region' in REQUIRED_FIELDS
@@ -0,0 +1,173 @@
+import math
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stratified_sampling import SAMPLE_INDEXES, StrataCounter, StratifiedSampler, Z_95, stratified_totals
+
+
+def sample_frame(rows):
+    """rows: (stratum, stratum_size, value, region)"""
+    return pd.DataFrame(rows, columns=['stratum', 'stratum_size', 'value', 'region'])
+
+
+def test_totals_and_interval_match_the_formula():
+    sample = sample_frame([
+        ('a', 10, 1.0, 'North'), ('a', 10, 3.0, 'South'),
+        ('b', 4, 2.0, 'North'), ('b', 4, 2.0, 'North'), ('b', 4, 2.0, 'South'), ('b', 4, 2.0, 'South')
+    ])
+
+    overall = stratified_totals(sample).iloc[0]
+
+    # Stratum a: N=10, n=2, mean 2, s^2 = 2; stratum b is a census
+    assert overall['total_sales'] == pytest.approx(10 * 2 + 8)
+    assert overall['total_sales_ci'] == pytest.approx(Z_95 * math.sqrt(10 ** 2 * (1 - 2 / 10) * 2 / 2))
+    assert overall['transaction_count'] == pytest.approx(14)
+    assert overall['transaction_count_ci'] == pytest.approx(0)
+
+
+def test_group_totals_treat_other_groups_as_zero():
+    sample = sample_frame([
+        ('a', 10, 1.0, 'North'), ('a', 10, 3.0, 'South'),
+        ('b', 4, 2.0, 'North'), ('b', 4, 2.0, 'North'), ('b', 4, 2.0, 'South'), ('b', 4, 2.0, 'South')
+    ])
+
+    by_region = stratified_totals(sample, by='region')
+
+    # North in stratum a: y = [1, 0], mean 0.5, s^2 = 0.5
+    assert by_region.loc['North', 'total_sales'] == pytest.approx(10 * 0.5 + 4)
+    assert by_region.loc['North', 'transaction_count'] == pytest.approx(10 * 0.5 + 2)
+    assert by_region.loc['North', 'total_sales_ci'] == pytest.approx(Z_95 * math.sqrt(100 * 0.8 * 0.5 / 2))
+    assert by_region['total_sales'].sum() == pytest.approx(stratified_totals(sample)['total_sales'].iloc[0])
+
+
+def test_census_is_exact():
+    rng = np.random.default_rng(0)
+    population = pd.DataFrame({
+        'stratum': rng.choice(['x', 'y', 'z'], 500),
+        'value': rng.lognormal(3, 1, 500),
+        'region': rng.choice(['North', 'South'], 500)
+    })
+    population['stratum_size'] = population.groupby('stratum')['stratum'].transform('size')
+
+    totals = stratified_totals(population, by='region')
+    exact = population.groupby('region')['value'].agg(['sum', 'size'])
+
+    assert totals['total_sales'].to_numpy() == pytest.approx(exact['sum'].to_numpy())
+    assert totals['transaction_count'].to_numpy() == pytest.approx(exact['size'].to_numpy())
+    assert totals['total_sales_ci'].to_numpy() == pytest.approx(0)
+
+
+def test_interval_covers_the_true_total():
+    rng = np.random.default_rng(1)
+    population = pd.DataFrame({
+        'stratum': rng.choice(list('abcd'), 40000),
+        'value': rng.lognormal(3, 1, 40000)
+    })
+    sizes = population['stratum'].value_counts()
+    true_total = population['value'].sum()
+
+    covered = 0
+    for seed in range(200):
+        sample = population.groupby('stratum').sample(100, random_state=seed)
+        sample = sample.assign(stratum_size=sample['stratum'].map(sizes), region='all')
+        estimate = stratified_totals(sample).iloc[0]
+        covered += abs(estimate['total_sales'] - true_total) <= estimate['total_sales_ci']
+
+    assert 0.90 <= covered / 200 <= 0.99
+
+
+class FakeCounts:
+    """The slice of a pymongo collection StrataCounter and StratifiedSampler use"""
+
+    def __init__(self):
+        self.documents = {}
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            query, update = operation._filter, operation._doc
+            document = self.documents.setdefault(query['_id'], dict(query, **update['$setOnInsert'], count=0))
+            document['count'] += update['$inc']['count']
+
+    def find(self, query):
+        return [document for document in self.documents.values()
+                if document['strata'] == query['strata'] and document['count'] > query['count']['$gt']]
+
+
+class FakeSales:
+    def __init__(self, size):
+        self.size = size
+
+    def estimated_document_count(self):
+        return self.size
+
+    def count_documents(self, query):
+        raise AssertionError('stratum sizes should come from the counters')
+
+
+def records(days):
+    return [{'timestamp': datetime(2026, 3, day, hour), 'category': category}
+            for day, hour, category in days]
+
+
+def test_counter_sizes_feed_the_sampler():
+    counts = FakeCounts()
+    counter = StrataCounter(counts, flush_interval=3600)
+    counter.record_batch(records([(1, 9, 'Books'), (1, 23, 'Toys'), (2, 0, 'Books')]))
+    counter.record_batch(records([(2, 5, 'Books')]))
+    assert counter.flush() == 4
+
+    day_sampler = StratifiedSampler(FakeSales(4), strata='day', counts=counts)
+    assert day_sampler.counted_sizes() == {datetime(2026, 3, 1).date(): 2, datetime(2026, 3, 2).date(): 2}
+    category_sampler = StratifiedSampler(FakeSales(4), strata='category', counts=counts)
+    assert category_sampler.counted_sizes() == {'Books': 3, 'Toys': 1}
+
+    strata = day_sampler.stratum_sizes()
+    assert [(stratum, size) for stratum, _, size in strata] == [(datetime(2026, 3, 1).date(), 2), (datetime(2026, 3, 2).date(), 2)]
+    assert strata[0][1] == {'timestamp': {'$gte': datetime(2026, 3, 1), '$lt': datetime(2026, 3, 2)}}
+
+
+def test_stale_counters_are_ignored(capsys):
+    counts = FakeCounts()
+    counter = StrataCounter(counts)
+    counter.record_batch(records([(1, 9, 'Books')]))
+    counter.flush()
+
+    assert StratifiedSampler(FakeSales(1000), counts=counts).counted_sizes() is None
+    assert 'rebuild' in capsys.readouterr().out
+
+
+class FakeLegacySales:
+    """Documents on March 1st predate sample_key"""
+
+    def __init__(self, indexes=(SAMPLE_INDEXES['day'],)):
+        self.indexes = indexes
+
+    def list_indexes(self):
+        return [{'key': dict(keys)} for keys in self.indexes]
+
+    def find_one(self, query, projection=None, sort=None):
+        if 'sample_key' in query:
+            return {'_id': 1} if query['timestamp']['$gte'] == datetime(2026, 3, 1) else None
+        return {'sample_key': 0.5}
+
+
+def test_strata_without_sample_key_fall_back_to_sample():
+    sampler = StratifiedSampler(FakeLegacySales())
+    assert sampler.resolve_method() == 'sample_key'
+
+    old_day = sampler.stratum_filter(datetime(2026, 3, 1))
+    new_day = sampler.stratum_filter(datetime(2026, 3, 2))
+    assert sampler.stratum_method(old_day, 'sample_key') == '$sample'
+    assert sampler.stratum_method(new_day, 'sample_key') == 'sample_key'
+    # An explicit method is not second-guessed
+    assert StratifiedSampler(FakeLegacySales(), method='sample_key').stratum_method(old_day, 'sample_key') == 'sample_key'
+
+
+def test_missing_sample_key_index_falls_back_to_sample(capsys):
+    assert StratifiedSampler(FakeLegacySales(indexes=()), strata='day').resolve_method() == '$sample'
+    assert 'stratified_sampling.py indexes' in capsys.readouterr().out
+    # The day index does not serve category strata
+    assert StratifiedSampler(FakeLegacySales(), strata='category').resolve_method() == '$sample'
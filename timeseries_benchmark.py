@@ -0,0 +1,158 @@
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from data_ingest import DataIngestion
+import db_connection
+from db_connection import utc_now
+from transformations import DataTransformer
+from timeseries_storage import DEFAULT_GRANULARITY, to_timeseries_documents
+from cli_options import parse_args
+
+
+def dashboard_aggregations(now):
+    """Time-bucketed aggregations the dashboards run, as (name, pipeline) pairs"""
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    thirty_days_ago = now - timedelta(days=30)
+    week_ago = now - timedelta(days=7)
+
+    return [
+        ('daily_sales_30d', [
+            {'$match': {'timestamp': {'$gte': thirty_days_ago}}},
+            {'$group': {
+                '_id': {'$dateTrunc': {'date': '$timestamp', 'unit': 'day'}},
+                'total_sales': {'$sum': '$value'}, 'transaction_count': {'$sum': 1}
+            }},
+            {'$sort': {'_id': 1}}
+        ]),
+        ('hourly_pattern', [
+            {'$group': {'_id': {'$hour': '$timestamp'}, 'total_sales': {'$sum': '$value'}}},
+            {'$sort': {'_id': 1}}
+        ]),
+        ('category_by_day_7d', [
+            {'$match': {'timestamp': {'$gte': week_ago}}},
+            {'$group': {
+                '_id': {'day': {'$dateTrunc': {'date': '$timestamp', 'unit': 'day'}}, 'category': '$category'},
+                'total_sales': {'$sum': '$value'}
+            }}
+        ]),
+        ('today_top_categories', [
+            {'$match': {'timestamp': {'$gte': today}}},
+            {'$group': {'_id': '$category', 'total': {'$sum': '$value'}}},
+            {'$sort': {'total': -1}},
+            {'$limit': 5}
+        ])
+    ]
+
+
+class TimeSeriesBenchmark:
+    """Compare the plain sales_data layout with a time-series collection on a local mongod"""
+
+    def __init__(self, database='linq_benchmark', granularity=DEFAULT_GRANULARITY):
+        self.client = db_connection.acquire()
+        self.db = db_connection.get_database(database)
+        self.granularity = granularity
+        self.ingestion = DataIngestion()
+        self.transformer = DataTransformer(verbose=False)
+
+    def create_collections(self):
+        """Fresh regular and time-series collections carrying the generator's indexes"""
+        for name in ('sales_data_regular', 'sales_data_ts'):
+            self.db.drop_collection(name)
+
+        regular = self.db.create_collection('sales_data_regular')
+        timeseries = self.db.create_collection('sales_data_ts', timeseries={
+            'timeField': 'timestamp', 'metaField': 'meta', 'granularity': self.granularity
+        })
+        for collection in (regular, timeseries):
+            collection.create_index([('timestamp', -1)])
+            collection.create_index([('customer_id', 1)])
+            collection.create_index([('category', 1), ('region', 1)])
+        return {'regular': regular, 'timeseries': timeseries}
+
+    def storage_stats(self, collection):
+        stats = next(collection.aggregate([{'$collStats': {'storageStats': {}}}]))['storageStats']
+        return {
+            'storage_mb': stats.get('storageSize', 0) / (1024 * 1024),
+            'index_mb': stats.get('totalIndexSize', 0) / (1024 * 1024)
+        }
+
+    def run(self, num_records, batch_size=10, chunk_size=10000, repeats=5):
+        collections = self.create_collections()
+        results = {name: {'inserted': 0, 'insert_seconds': 0.0} for name in collections}
+
+        print(f"Inserting {num_records:,} records in batches of {batch_size} into each layout...")
+        for start in range(0, num_records, chunk_size):
+            documents, _ = self.transformer.transform_pipeline(
+                self.ingestion.generate_chunk(start, min(start + chunk_size, num_records))
+            )
+
+            # Alternate which layout goes first so neither benefits from a warmer cache
+            order = ['regular', 'timeseries'] if (start // chunk_size) % 2 == 0 else ['timeseries', 'regular']
+            for name in order:
+                batch_source = [dict(doc) for doc in documents]
+                if name == 'timeseries':
+                    batch_source = to_timeseries_documents(batch_source)
+
+                begin = time.perf_counter()
+                for i in range(0, len(batch_source), batch_size):
+                    collections[name].insert_many(batch_source[i:i + batch_size], ordered=False)
+                results[name]['insert_seconds'] += time.perf_counter() - begin
+                results[name]['inserted'] += len(batch_source)
+
+        for name, collection in collections.items():
+            results[name]['insert_tps'] = results[name]['inserted'] / results[name]['insert_seconds']
+            results[name].update(self.storage_stats(collection))
+
+            results[name]['aggregations'] = {}
+            for query_name, pipeline in dashboard_aggregations(utc_now()):
+                latencies = []
+                for _ in range(repeats):
+                    begin = time.perf_counter()
+                    list(collection.aggregate(pipeline))
+                    latencies.append((time.perf_counter() - begin) * 1000)
+                results[name]['aggregations'][query_name] = statistics.median(latencies)
+
+        self.print_report(results)
+        return results
+
+    def print_report(self, results):
+        print(f"\n {'':<24} {'regular':>12} {'timeseries':>12}")
+        print(f" {'insert TPS':<24} {results['regular']['insert_tps']:>12,.0f} {results['timeseries']['insert_tps']:>12,.0f}")
+        print(f" {'storage MB':<24} {results['regular']['storage_mb']:>12.1f} {results['timeseries']['storage_mb']:>12.1f}")
+        print(f" {'index MB':<24} {results['regular']['index_mb']:>12.1f} {results['timeseries']['index_mb']:>12.1f}")
+        for query_name in results['regular']['aggregations']:
+            print(f" {query_name + ' ms':<24} {results['regular']['aggregations'][query_name]:>12.2f} "
+                  f"{results['timeseries']['aggregations'][query_name]:>12.2f}")
+
+    def close(self):
+        db_connection.release()
+
+
+def main():
+    """python timeseries_benchmark.py [num_records] [batch_size] [--granularity=minutes] [--json=results.json]"""
+    args, options = parse_args()
+
+    num_records = int(args[0]) if args else 200000
+    batch_size = int(args[1]) if len(args) > 1 else 10
+
+    benchmark = TimeSeriesBenchmark(granularity=options.get('granularity', DEFAULT_GRANULARITY))
+    try:
+        db_connection.verify_connection()
+        results = benchmark.run(num_records, batch_size)
+        if options.get('json'):
+            with open(options['json'], 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"\n Results written to {options['json']}")
+
+    except KeyboardInterrupt:
+        print("\n Benchmark interrupted by user")
+    except Exception as e:
+        print(f" Benchmark failed: {e}")
+        sys.exit(1)
+    finally:
+        benchmark.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+SALES_COLLECTION = 'sales_data'
+TIMESERIES_COLLECTION = 'sales_data_ts'
+
+# Each region/category series sees roughly one transaction per second at 50 TPS. A 'minutes'
+# bucket may span up to 24 hours of a series, but closes once it holds 1000 measurements,
+# so at that rate each bucket covers about 17 minutes
+DEFAULT_GRANULARITY = 'minutes'
+
+
+def get_sales_collection(db, timeseries=False, granularity=DEFAULT_GRANULARITY, create=True):
+    """Return the sales collection, creating the time-series variant on first use
+
+    Readers pass create=False, so pointing a dashboard at an empty database doesn't create it.
+    """
+    if not timeseries:
+        return db[SALES_COLLECTION]
+
+    if create and not db.list_collection_names(filter={'name': TIMESERIES_COLLECTION}):
+        db.create_collection(
+            TIMESERIES_COLLECTION,
+            timeseries={
+                'timeField': 'timestamp',
+                'metaField': 'meta',
+                'granularity': granularity
+            }
+        )
+    return db[TIMESERIES_COLLECTION]
+
+
+def to_timeseries_documents(records):
+    """Add the region/category meta field that time-series buckets are grouped by
+
+    Top-level region and category are kept so the same queries work against either
+    layout; readers select it with get_sales_collection(db, timeseries=True).
+    """
+    for record in records:
+        record['meta'] = {'region': record['region'], 'category': record['category']}
+    return records
@@ -0,0 +1,131 @@
+import statistics
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+from db_connection import utc_now
+from file_import import detect_format, read_chunks
+from sales_schema import REQUIRED_FIELDS
+
+
+def file_records(path, chunk_size=50000):
+    """Recorded transactions from a CSV/JSONL/Parquet file, in timestamp order within each chunk
+
+    Files are expected to be roughly time-ordered (as exports are); chunks are sorted,
+    but a record older than the previous chunk is replayed as soon as it is reached.
+    """
+    with open(path, 'rb') as handle:
+        for chunk in read_chunks(handle, detect_format(path), chunk_size):
+            chunk = chunk[[field for field in REQUIRED_FIELDS if field in chunk]].copy()
+            chunk['timestamp'] = pd.to_datetime(chunk['timestamp']).dt.floor('us')
+            for record in chunk.sort_values('timestamp', kind='stable').to_dict('records'):
+                record['timestamp'] = record['timestamp'].to_pydatetime()
+                yield record
+
+
+def collection_records(collection, start, end, batch_size=5000):
+    """Recorded transactions from a collection time range, streamed in timestamp order"""
+    projection = {field: 1 for field in REQUIRED_FIELDS}
+    projection['_id'] = 0
+    return collection.find(
+        {'timestamp': {'$gte': start, '$lt': end}}, projection, batch_size=batch_size
+    ).sort('timestamp', 1)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class TrafficReplay:
+    """Re-emit recorded transactions through a generator's transform and insert path
+
+    Each record is scheduled at replay_start + (recorded_time - first_recorded_time) / speed,
+    so the recorded inter-arrival times are preserved at any speed; speed=0 replays as fast as
+    possible. Records that are already due are written together (up to max_batch), and the
+    lag between each record's schedule and its acknowledged insert is recorded to report how
+    faithfully the load shape was reproduced.
+    """
+
+    def __init__(self, generator, speed=1.0, keep_timestamps=False, max_batch=500):
+        self.generator = generator
+        self.speed = speed
+        self.keep_timestamps = keep_timestamps
+        self.max_batch = max_batch
+        self.lags = []
+        self.emitted = 0
+        self.inserted = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+    def flush(self, batch, due_times):
+        if not self.keep_timestamps:
+            # Stamp records with the wall-clock time they were scheduled for, so they read as live traffic
+            for record, due in zip(batch, due_times):
+                record['timestamp'] = self.wall_start + timedelta(seconds=due - self.replay_start)
+        self.inserted += self.generator.process_and_store_batch(batch) or 0
+        done = time.perf_counter()
+        self.lags.extend(done - due for due in due_times)
+        self.emitted += len(batch)
+
+    def replay(self, records):
+        """Replay an iterable of records in timestamp order; returns fidelity statistics"""
+        self.replay_start = time.perf_counter()
+        self.wall_start = utc_now()
+        batch, due_times = [], []
+
+        for record in records:
+            if self.first_timestamp is None:
+                self.first_timestamp = record['timestamp']
+            self.last_timestamp = record['timestamp']
+            offset = (record['timestamp'] - self.first_timestamp).total_seconds()
+            due = self.replay_start + (offset / self.speed if self.speed > 0 else 0)
+
+            now = time.perf_counter()
+            if batch and (due > now or len(batch) >= self.max_batch):
+                self.flush(batch, due_times)
+                batch, due_times = [], []
+                now = time.perf_counter()
+            if due > now:
+                time.sleep(due - now)
+
+            batch.append(record)
+            due_times.append(max(due, self.replay_start))
+
+        if batch:
+            self.flush(batch, due_times)
+
+        return self.summarize(time.perf_counter() - self.replay_start)
+
+    def summarize(self, elapsed):
+        """Fidelity statistics for the records replayed so far (also used after an interrupt)"""
+        lags = sorted(self.lags)
+        recorded_seconds = (self.last_timestamp - self.first_timestamp).total_seconds() if self.first_timestamp else 0
+        stats = {
+            'emitted': self.emitted,
+            'inserted': self.inserted,
+            'recorded_seconds': recorded_seconds,
+            'replay_seconds': elapsed,
+            'achieved_speed': recorded_seconds / elapsed if elapsed > 0 else 0,
+            'recorded_rate': self.emitted / recorded_seconds if recorded_seconds > 0 else 0,
+            'records_per_sec': self.emitted / elapsed if elapsed > 0 else 0
+        }
+        if lags:
+            stats.update({
+                'lag_p50_ms': percentile(lags, 0.50) * 1000,
+                'lag_p90_ms': percentile(lags, 0.90) * 1000,
+                'lag_p99_ms': percentile(lags, 0.99) * 1000,
+                'lag_max_ms': lags[-1] * 1000,
+                'lag_mean_ms': statistics.fmean(lags) * 1000
+            })
+        return stats
+
+    def print_report(self, stats):
+        speed = f"{self.speed:g}x" if self.speed > 0 else "max speed"
+        print(f"\n REPLAY COMPLETE ({speed}):")
+        print(f"   Records: {stats['emitted']:,} emitted, {stats['inserted']:,} inserted")
+        print(f"   Recorded span: {stats['recorded_seconds']:.1f}s | Replay time: {stats['replay_seconds']:.1f}s "
+              f"| Achieved speed: {stats['achieved_speed']:.2f}x")
+        print(f"   Rate: {stats['records_per_sec']:,.1f} records/sec achieved vs {stats['recorded_rate']:,.1f} recorded"
+              + (f" ({stats['recorded_rate'] * self.speed:,.1f} scheduled at {speed})" if self.speed > 0 else ""))
+        if 'lag_p50_ms' in stats and self.speed > 0:
+            print(f"   Lag vs schedule: p50 {stats['lag_p50_ms']:.1f} ms | p90 {stats['lag_p90_ms']:.1f} ms | "
+                  f"p99 {stats['lag_p99_ms']:.1f} ms | max {stats['lag_max_ms']:.1f} ms")
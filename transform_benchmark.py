@@ -0,0 +1,178 @@
+import json
+import statistics
+import sys
+import time
+import numpy as np
+import pandas as pd
+from data_ingest import DataIngestion
+from sales_schema import CATEGORIES, REGIONS, SEASONS, apply_categorical_schema
+from transformations import DataTransformer
+from cli_options import parse_args
+
+
+def baseline_time_features(df, region_coordinates):
+    """enrich_data's time and geographic block before local-time support, kept for comparison"""
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['hour'] = df['timestamp'].dt.hour
+    df['day_of_week'] = df['timestamp'].dt.day_name()
+    df['is_weekend'] = df['timestamp'].dt.weekday >= 5
+    df['is_business_hours'] = (df['hour'] >= 9) & (df['hour'] <= 17)
+    df['month'] = df['timestamp'].dt.month
+    df['region_lat'] = df['region'].map(lambda x: region_coordinates[x]['lat'])
+    df['region_lng'] = df['region'].map(lambda x: region_coordinates[x]['lng'])
+    df['timezone'] = df['region'].map(lambda x: region_coordinates[x]['timezone'])
+    return df
+
+
+def local_time_features(df, transformer):
+    """The same block as enrich_data now computes it: vectorized maps, then per-timezone local time"""
+    coordinates = pd.DataFrame.from_dict(transformer.region_coordinates, orient='index')
+    df['region_lat'] = df['region'].map(coordinates['lat'])
+    df['region_lng'] = df['region'].map(coordinates['lng'])
+    df['timezone'] = df['region'].map(coordinates['timezone'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    local = transformer.local_timestamps(df)
+    df['hour'] = local.dt.hour
+    df['day_of_week'] = local.dt.day_name()
+    df['is_weekend'] = local.dt.weekday >= 5
+    df['is_business_hours'] = (df['hour'] >= 9) & (df['hour'] <= 17)
+    df['month'] = local.dt.month
+    return df
+
+
+def time_call(function, frame, repeats):
+    """Median seconds over repeats, each on a fresh copy so no run sees another's columns"""
+    samples = []
+    for _ in range(repeats):
+        df = frame.copy()
+        start = time.perf_counter()
+        function(df)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def run_local_time(num_rows=1000000, repeats=3):
+    """Time features from naive timestamps with per-row lookups vs. per-region local time"""
+    print(f"Generating {num_rows:,} rows...")
+    frame = pd.DataFrame(DataIngestion().generate_chunk(0, num_rows))
+    transformer = DataTransformer(verbose=False)
+
+    results = {
+        'rows': num_rows,
+        'baseline_seconds': time_call(lambda df: baseline_time_features(df, transformer.region_coordinates), frame, repeats),
+        'local_time_seconds': time_call(lambda df: local_time_features(df, transformer), frame, repeats),
+        'enrich_data_seconds': time_call(transformer.enrich_data, frame, repeats)
+    }
+
+    print(f"\n {'':<32} {'seconds':>10} {'rows/sec':>14}")
+    for label, key in (('naive time + per-row lookups', 'baseline_seconds'),
+                       ('local time, vectorized', 'local_time_seconds'),
+                       ('full enrich_data', 'enrich_data_seconds')):
+        print(f" {label:<32} {results[key]:>10.3f} {num_rows / results[key]:>14,.0f}")
+    return results
+
+
+def time_query(function, repeats):
+    """Median seconds of a read-only query over repeats"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def synthetic_sales(num_rows, seed=0):
+    """Sales-shaped frame with object string columns, as a DataFrame built from documents has"""
+    rng = np.random.default_rng(seed)
+    customer_ids = np.array([f"CUST_{number:06d}" for number in range(100000, 1000000)], dtype=object)
+    # dtype=object explicitly: pandas 3 would otherwise infer its string dtype
+    return pd.DataFrame({
+        'category': pd.Series(np.array(CATEGORIES, dtype=object)[rng.integers(0, len(CATEGORIES), num_rows)], dtype=object),
+        'region': pd.Series(np.array(REGIONS, dtype=object)[rng.integers(0, len(REGIONS), num_rows)], dtype=object),
+        'season': pd.Series(np.array(SEASONS, dtype=object)[rng.integers(0, len(SEASONS), num_rows)], dtype=object),
+        'customer_id': pd.Series(customer_ids[rng.integers(0, len(customer_ids), num_rows)], dtype=object),
+        'value': rng.lognormal(4.5, 1.0, num_rows).round(2)
+    })
+
+
+def measure_layout(df, repeats):
+    """Deep memory of the frame and median times of the dashboard's typical groupbys"""
+    return {
+        'memory_mb': df.memory_usage(deep=True).sum() / 1e6,
+        'sum_by_category_seconds': time_query(
+            lambda: df.groupby('category', observed=True)['value'].sum(), repeats),
+        'sum_by_category_region_seconds': time_query(
+            lambda: df.groupby(['category', 'region'], observed=True)['value'].sum(), repeats),
+        'sum_by_customer_seconds': time_query(
+            lambda: df.groupby('customer_id', observed=True)['value'].sum(), repeats),
+        'unique_customers_seconds': time_query(lambda: df['customer_id'].nunique(), repeats)
+    }
+
+
+def run_categorical(num_rows=10000000, repeats=3):
+    """Memory and groupby speed of object, string and categorical layouts of the same rows
+
+    Layouts are measured one at a time and dropped before the next is built, so peak
+    memory stays around the object frame plus one copy of the string columns.
+    """
+    print(f"Generating {num_rows:,} rows...")
+    frame = synthetic_sales(num_rows)
+    string_columns = ['category', 'region', 'season', 'customer_id']
+    results = {'rows': num_rows, 'layouts': {}}
+
+    print(" Measuring object layout...")
+    results['layouts']['object'] = measure_layout(frame, repeats)
+
+    print(" Measuring string layout...")
+    start = time.perf_counter()
+    strings = frame.astype({column: 'string' for column in string_columns})
+    convert_seconds = time.perf_counter() - start
+    results['layouts']['string'] = {'convert_seconds': convert_seconds, **measure_layout(strings, repeats)}
+    del strings
+
+    print(" Measuring categorical layout...")
+    start = time.perf_counter()
+    categorical = apply_categorical_schema(frame)
+    convert_seconds = time.perf_counter() - start
+    del frame
+    results['layouts']['categorical'] = {'convert_seconds': convert_seconds, **measure_layout(categorical, repeats)}
+    del categorical
+
+    rows = (('memory (MB)', 'memory_mb', '{:,.0f}'),
+            ('sum by category (s)', 'sum_by_category_seconds', '{:.3f}'),
+            ('sum by category x region (s)', 'sum_by_category_region_seconds', '{:.3f}'),
+            ('sum by customer (s)', 'sum_by_customer_seconds', '{:.3f}'),
+            ('unique customers (s)', 'unique_customers_seconds', '{:.3f}'),
+            ('conversion from object (s)', 'convert_seconds', '{:.3f}'))
+    layouts = results['layouts']
+    print(f"\n {'':<30}" + ''.join(f"{name:>14}" for name in layouts))
+    for label, key, template in rows:
+        cells = ''.join(f"{template.format(layout[key]) if key in layout else '-':>14}" for layout in layouts.values())
+        print(f" {label:<30}{cells}")
+    return results
+
+
+BENCHMARKS = {
+    'local_time': run_local_time,
+    'categorical': run_categorical
+}
+
+
+def main():
+    """python transform_benchmark.py [benchmark] [num_rows] [--json=results.json]"""
+    args, options = parse_args()
+
+    name = args[0] if args else 'local_time'
+    if name not in BENCHMARKS:
+        print(f"Unknown benchmark '{name}'; choose one of {', '.join(BENCHMARKS)}")
+        sys.exit(1)
+
+    results = BENCHMARKS[name](int(args[1])) if len(args) > 1 else BENCHMARKS[name]()
+    if options.get('json'):
+        with open(options['json'], 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n Results written to {options['json']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,26 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import re
+from datetime import datetime, timedelta, timezone
+from sales_schema import BatchValidator, PRICE_TIERS, apply_categorical_schema, to_records
+import rules_engine
 
 class DataTransformer:
-    def __init__(self):
+    def __init__(self, verbose=True, profile_store=None, rules=None, local_time=True, cents=False,
+                 drop_outliers=True):
+        self.verbose = verbose
+        # Carry monetary fields as int64 cents (business_rules_cents.json) instead of float dollars
+        self.cents = cents
+        # Derive hour/day/season features in each region's timezone (naive timestamps are UTC)
+        self.local_time = local_time
+        # Trim values beyond 3 standard deviations of the batch; imports of recorded data keep them
+        self.drop_outliers = drop_outliers
+        # Optional RuleEngine; by default business_rules.json (or LINQ_BUSINESS_RULES), or
+        # business_rules_cents.json in cents mode, is used
+        self.rules = rules
+        self.validator = BatchValidator()
+        # Optional CustomerProfileStore: segments from lifetime profiles instead of the batch
+        self.profile_store = profile_store
+        self.rng = np.random.default_rng()
         self.category_mapping = {
             'Electronics': 'Tech',
             'Clothing': 'Fashion',
@@ -24,9 +40,14 @@ class DataTransformer:
             'Central': {'lat': 39.0, 'lng': -98.0, 'timezone': 'America/Chicago'}
         }
 
+    def log(self, message):
+        """Print pipeline progress unless running quietly (bulk and realtime loads)"""
+        if self.verbose:
+            print(message)
+
     def clean_data(self, data):
         """Clean and validate raw data"""
-        print("Cleaning data...")
+        self.log("Cleaning data...")
         
         # Convert to DataFrame if it's a list
         if isinstance(data, list):
@@ -38,41 +59,50 @@ class DataTransformer:
         
         # Remove duplicates based on customer_id and timestamp
         df = df.drop_duplicates(subset=['customer_id', 'timestamp'], keep='first')
-        # Validate customer_id format
-        df = df[df['customer_id'].str.match(r'^CUST_\d{6}$', na=False)]
+
+        # Validate required fields, membership, value range, customer_id format and timestamps in one pass
+        mask, reasons = self.validator.validate(df)
+        df = df[mask]
+        for reason, count in reasons.value_counts().items():
+            self.log(f"   Rejected {count} records: {reason}")
         
-        # Remove outliers (values beyond 3 standard deviations)
+        # Remove outliers (values beyond 3 standard deviations); undefined for single-row batches
         mean_val = df['value'].mean()
         std_val = df['value'].std()
-        df = df[np.abs(df['value'] - mean_val) <= (3 * std_val)]
-        
-        # Ensure positive values
-        df = df[df['value'] > 0]
+        if self.drop_outliers and pd.notna(std_val):
+            df = df[np.abs(df['value'] - mean_val) <= (3 * std_val)]
         
         cleaned_count = len(df)
-        print(f"   Removed {original_count - cleaned_count} invalid records")
-        print(f"   Retained {cleaned_count} clean records")
+        self.log(f"   Removed {original_count - cleaned_count} invalid records")
+        self.log(f"   Retained {cleaned_count} clean records")
         
         return df
 
     def enrich_data(self, df):
         """Enrich data with additional calculated fields"""
-        print("Enriching data...")
+        self.log("Enriching data...")
         
         # Add price tier classification
         df['price_tier'] = pd.cut(df['value'], 
                                  bins=[0, 50, 150, 500, float('inf')],
-                                 labels=['Budget', 'Mid-range', 'Premium', 'Luxury'])
+                                 labels=PRICE_TIERS)
         
-        # Add time-based features
+        # Add geographic enrichment (whole-column maps, not a lookup per row)
+        coordinates = pd.DataFrame.from_dict(self.region_coordinates, orient='index')
+        df['region_lat'] = df['region'].map(coordinates['lat']).astype(float)
+        df['region_lng'] = df['region'].map(coordinates['lng']).astype(float)
+        df['timezone'] = df['region'].map(coordinates['timezone'])
+        
+        # Add time-based features, from the region's local time
         df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df['hour'] = df['timestamp'].dt.hour
-        df['day_of_week'] = df['timestamp'].dt.day_name()
-        df['is_weekend'] = df['timestamp'].dt.weekday >= 5
+        local = self.local_timestamps(df) if self.local_time else df['timestamp']
+        df['hour'] = local.dt.hour
+        df['day_of_week'] = local.dt.day_name()
+        df['is_weekend'] = local.dt.weekday >= 5
         df['is_business_hours'] = (df['hour'] >= 9) & (df['hour'] <= 17)
         
         # Add seasonal classification
-        df['month'] = df['timestamp'].dt.month
+        df['month'] = local.dt.month
         df['season'] = df['month'].map({
             12: 'Winter', 1: 'Winter', 2: 'Winter',
             3: 'Spring', 4: 'Spring', 5: 'Spring',
@@ -80,13 +110,43 @@ class DataTransformer:
             9: 'Fall', 10: 'Fall', 11: 'Fall'
         })
         
-        # Add geographic enrichment
-        df['region_lat'] = df['region'].map(lambda x: self.region_coordinates[x]['lat'])
-        df['region_lng'] = df['region'].map(lambda x: self.region_coordinates[x]['lng'])
-        df['timezone'] = df['region'].map(lambda x: self.region_coordinates[x]['timezone'])
+        # Add customer segment from lifetime profiles when available, else from this batch
+        segments = self.profile_store.segment(df['customer_id']) if self.profile_store else None
+        if segments is not None:
+            df['customer_segment'] = segments
+        else:
+            df = self.segment_customers_in_batch(df)
+        
+        # Uniform random key so dashboards can draw indexed samples (see stratified_sampling.py)
+        df['sample_key'] = self.rng.random(len(df))
+        
+        # One conversion at the boundary: the input and derived labels leave as fixed-dictionary categoricals
+        df = apply_categorical_schema(df)
+        
+        self.log(f"   Added enrichment fields: price_tier, time features, geographic data, customer segments")
         
-        # Add customer segment based on transaction patterns
-        customer_stats = df.groupby('customer_id')['value'].agg(['count', 'sum', 'mean']).reset_index()
+        return df
+
+    def local_timestamps(self, df):
+        """Naive local time for every row, converted one timezone at a time
+
+        Naive timestamps are UTC: writers stamp db_connection.utc_now(), and MongoDB returns
+        stored dates as naive UTC. Each distinct timezone takes one vectorized tz_convert over
+        its rows, so the cost is a handful of array passes regardless of batch size.
+        """
+        timestamps = df['timestamp']
+        utc = timestamps.dt.tz_localize('UTC') if timestamps.dt.tz is None else timestamps.dt.tz_convert('UTC')
+        local = utc.dt.tz_localize(None).to_numpy().copy()
+
+        codes, timezones = pd.factorize(df['timezone'])
+        for code, zone in enumerate(timezones):
+            rows = codes == code
+            local[rows] = utc[rows].dt.tz_convert(zone).dt.tz_localize(None).to_numpy()
+        return pd.Series(local, index=df.index)
+
+    def segment_customers_in_batch(self, df):
+        """Classify customers from transaction patterns within this batch only"""
+        customer_stats = df.groupby('customer_id', observed=True)['value'].agg(['count', 'sum', 'mean']).reset_index()
         customer_stats.columns = ['customer_id', 'transaction_count', 'total_spent', 'avg_transaction']
         
         # Classify customers
@@ -96,59 +156,47 @@ class DataTransformer:
         customer_stats.loc[(customer_stats['total_spent'] > customer_stats['total_spent'].quantile(0.9)) & 
                           (customer_stats['transaction_count'] > customer_stats['transaction_count'].quantile(0.8)), 'customer_segment'] = 'Champion'
         
-        # Merge customer segments back to main dataframe
-        df = df.merge(customer_stats[['customer_id', 'customer_segment']], on='customer_id', how='left')
-        
-        print(f"   Added enrichment fields: price_tier, time features, geographic data, customer segments")
-        
+        # Merge customer segments back to main dataframe, replacing any stored segment (backfill)
+        df = df.drop(columns='customer_segment', errors='ignore').merge(customer_stats[['customer_id', 'customer_segment']], on='customer_id', how='left')
         return df
 
     def apply_business_rules(self, df):
-        """Apply business-specific transformations"""
-        print("Applying business rules...")
-        
-        # Calculate discount eligibility
-        df['discount_eligible'] = (
-            (df['customer_segment'].isin(['VIP', 'Champion'])) |
-            (df['value'] > 200) |
-            (df['is_weekend'] == False)
-        )
-        
-        # Calculate loyalty points (1 point per $10 spent)
-        df['loyalty_points'] = (df['value'] / 10).astype(int)
-        
-        # Add sales commission calculation
-        commission_rates = {
-            'Electronics': 0.05,
-            'Clothing': 0.08,
-            'Home & Garden': 0.06,
-            'Sports': 0.07,
-            'Books': 0.03,
-            'Health & Beauty': 0.09,
-            'Automotive': 0.04,
-            'Toys': 0.10
-        }
-        df['commission_rate'] = df['category'].map(commission_rates)
-        df['commission_amount'] = df['value'] * df['commission_rate']
+        """Apply business-specific transformations from the configured rule set"""
+        self.log("Applying business rules...")
         
-        # Add tax calculation (8.5% average sales tax)
-        df['tax_amount'] = df['value'] * 0.085
-        df['total_with_tax'] = df['value'] + df['tax_amount']
+        # Discounts, loyalty points, commissions and taxes are defined in the rules file;
+        # the default engine is recompiled only when that file changes
+        rules = self.rules or rules_engine.load_rules(rules_engine.CENTS_RULES_PATH if self.cents else None)
+        df = rules.apply(df)
         
-        print(f"   Applied business rules: discounts, loyalty points, commissions, taxes")
+        self.log(f"   Applied {len(rules.rules)} business rules (version {rules.version})")
         
         return df
 
     def aggregate_metrics(self, df):
         """Calculate aggregate metrics for reporting"""
-        print("📈 Calculating aggregate metrics...")
-        
+        self.log("📈 Calculating aggregate metrics...")
+        
+        if 'value_cents' in df:
+            # Exact integer sums, converted to dollars once
+            money = {
+                'total_revenue_cents': int(df['value_cents'].sum()),
+                'total_tax_collected_cents': int(df['tax_cents'].sum()),
+                'total_commissions_cents': int(df['commission_cents'].sum())
+            }
+            money.update({key[:-len('_cents')]: value / 100 for key, value in money.items()})
+            money['avg_transaction'] = money['total_revenue'] / len(df) if len(df) else float('nan')
+        else:
+            money = {
+                'total_revenue': df['value'].sum(),
+                'avg_transaction': df['value'].mean(),
+                'total_tax_collected': df['tax_amount'].sum(),
+                'total_commissions': df['commission_amount'].sum()
+            }
+
         metrics = {
             'total_records': len(df),
-            'total_revenue': df['value'].sum(),
-            'avg_transaction': df['value'].mean(),
-            'total_tax_collected': df['tax_amount'].sum(),
-            'total_commissions': df['commission_amount'].sum(),
+            **money,
             'total_loyalty_points': df['loyalty_points'].sum(),
             'unique_customers': df['customer_id'].nunique(),
             'categories_count': df['category'].nunique(),
@@ -159,12 +207,12 @@ class DataTransformer:
             'champion_customers': len(df[df['customer_segment'] == 'Champion'])
         }
         
-        print("   Calculated comprehensive business metrics")
+        self.log("   Calculated comprehensive business metrics")
         return metrics
 
     def transform_pipeline(self, raw_data):
         """Complete transformation pipeline"""
-        print("Starting data transformation pipeline...")
+        self.log("Starting data transformation pipeline...")
         
         # Step 1: Clean data
         df = self.clean_data(raw_data)
@@ -178,10 +226,10 @@ class DataTransformer:
         # Step 4: Calculate metrics
         metrics = self.aggregate_metrics(df)
         
-        print("Data transformation pipeline completed")
+        self.log("Data transformation pipeline completed")
         
-        # Convert back to list of dictionaries for MongoDB
-        transformed_data = df.to_dict('records')
+        # Convert back to list of dictionaries (plain labels) for the sink
+        transformed_data = to_records(df)
         
         return transformed_data, metrics
 
@@ -194,14 +242,14 @@ def main():
         {
             'category': 'Electronics',
             'value': 299.99,
-            'timestamp': datetime.now(),
+            'timestamp': datetime.now(timezone.utc),
             'region': 'North',
             'customer_id': 'CUST_123456'
         },
         {
             'category': 'Books',
             'value': 25.50,
-            'timestamp': datetime.now() - timedelta(hours=2),
+            'timestamp': datetime.now(timezone.utc) - timedelta(hours=2),
             'region': 'East',
             'customer_id': 'CUST_789012'
         }